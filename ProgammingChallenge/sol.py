@@ -1,6 +1,7 @@
 import sys
 import threading
 import random
+from bisect import bisect_left, bisect_right
 
 sys.setrecursionlimit(1 << 25)
 
@@ -71,12 +72,70 @@ def remove(node, key):
     update_size(node)
     return node
 
-def simulate(node, T):
+def stack_from(node, rank):
+    # In-order stack positioned so that popping starts at the node with the
+    # given rank (0-based), found through the subtree sizes
     stack = []
-    cur = node
-    time = 0
-    pos = 0
-    cnt = 0
+    while node:
+        left = node.left.size if node.left else 0
+        if rank <= left:
+            stack.append(node)
+            node = node.left
+        else:
+            rank -= left + 1
+            node = node.right
+    return stack
+
+class SimCache:
+    # Checkpoints of the "wait for every crop" walk: after the k-th crop in
+    # position order (rank k-1) it stands at ps[k-1] at time times[k-1]
+    # with k crops harvested. A query T follows exactly this walk for as
+    # long as its time stays <= T (it never has to skip a crop or stop
+    # before then), so it can resume after the last such checkpoint.
+    # The times never decrease, which makes that a binary search.
+    def __init__(self):
+        self.ps = []
+        self.times = []
+
+    # ADD/REMOVE at p changes the walk from p onwards only
+    def invalidate(self, p):
+        k = bisect_left(self.ps, p)
+        del self.ps[k:]
+        del self.times[k:]
+
+    # (rank, time, pos, cnt) to resume a query T from, extending the
+    # checkpoints lazily until they pass T
+    def resume(self, root, T):
+        ps, times = self.ps, self.times
+        n = root.size if root else 0
+        if len(ps) < n and (not times or times[-1] <= T):
+            time = times[-1] if times else 0
+            pos = ps[-1] if ps else 0
+            stack = stack_from(root, len(ps))
+            cur = None
+            while cur or stack:
+                while cur:
+                    stack.append(cur)
+                    cur = cur.left
+                cur = stack.pop()
+                time += cur.p - pos
+                pos = cur.p
+                if time < cur.t:
+                    time = cur.t
+                ps.append(pos)
+                times.append(time)
+                if time > T:
+                    break
+                cur = cur.right
+        k = bisect_right(times, T)
+        if k == 0:
+            return 0, 0, 0, 0
+        return k, times[k - 1], ps[k - 1], k
+
+def simulate(node, T, rank=0, time=0, pos=0, cnt=0):
+    # rank, time, pos and cnt resume a walk from a SimCache checkpoint
+    stack = stack_from(node, rank)
+    cur = None
 
     while cur or stack:
         while cur:
@@ -99,21 +158,110 @@ def simulate(node, T):
         cur = cur.right
     return cnt
 
+def simulate_batch(node, Ts, rank=0, time=0, pos=0, cnt=0):
+    # Answers simulate(node, T) for every T in Ts with one in-order walk.
+    # The arrival time at each node is monotone in T (a larger T only ever
+    # waits longer), so with the Ts sorted, queries sharing a state form
+    # contiguous runs. Each run is (lo, hi, time) over the sorted order; a
+    # harvest adds 1 to the whole run through a difference array, queries
+    # whose T is passed drop off the front of their run, and a run splits
+    # in two where some of its queries wait for a crop and the rest don't.
+    # rank, time, pos and cnt resume from a SimCache checkpoint, which
+    # must be valid for the smallest T (and so for all of them).
+    m = len(Ts)
+    order = sorted(range(m), key=Ts.__getitem__)
+    ts = [Ts[i] for i in order]
+    diff = [0] * (m + 1)
+    diff[0] += cnt; diff[m] -= cnt
+    runs = [(0, m, time)] if m else []
+    stack = stack_from(node, rank)
+    cur = None
+    while runs and (cur or stack):
+        while cur:
+            stack.append(cur)
+            cur = cur.left
+        cur = stack.pop()
+        move = cur.p - pos
+        pos = cur.p
+        t = cur.t
+        nxt = []
+        for lo, hi, time in runs:
+            time += move
+            if ts[lo] < time:  # T < time: finished
+                lo = bisect_left(ts, time, lo, hi)
+                if lo == hi:
+                    continue
+            if time >= t or ts[lo] >= t:  # everyone harvests
+                diff[lo] += 1; diff[hi] -= 1
+                if time < t:
+                    time = t
+            elif ts[hi - 1] >= t:  # T >= t waits and harvests, the rest moves on
+                mid = bisect_left(ts, t, lo, hi)
+                diff[mid] += 1; diff[hi] -= 1
+                if nxt and nxt[-1][2] == time:
+                    nxt[-1] = (nxt[-1][0], mid, time)
+                else:
+                    nxt.append((lo, mid, time))
+                lo, time = mid, t
+            if nxt and nxt[-1][2] == time:
+                nxt[-1] = (nxt[-1][0], hi, time)
+            else:
+                nxt.append((lo, hi, time))
+        runs = nxt
+        cur = cur.right
+    ans = [0] * m
+    acc = 0
+    for i in range(m):
+        acc += diff[i]
+        ans[order[i]] = acc
+    return ans
+
+ADD, REMOVE, QUERY = range(3)
+OPCODES = {b"ADD": ADD, b"REMOVE": REMOVE, b"QUERY": QUERY}
+
 def main():
-    import sys
-    input = sys.stdin.readline
-    q = int(input())
+    # read and tokenize the whole input once, answer with one write
+    data = sys.stdin.buffer.read().split()
+    q = int(data[0])
+    pos = 1
     root = None
-    for _ in range(q):
-        tok = input().strip().split()
-        if tok[0] == "ADD":
-            p, t = int(tok[1]), int(tok[2])
+    cache = SimCache()
+    out = []
+    remaining = q
+    while remaining:
+        remaining -= 1
+        op = OPCODES.get(data[pos])
+        if op is None:
+            # unknown command: skip it and its arguments, up to the next
+            # known one
+            pos += 1
+            while pos < len(data) and data[pos] not in OPCODES:
+                pos += 1
+        elif op == ADD:
+            p, t = int(data[pos + 1]), int(data[pos + 2])
+            pos += 3
+            cache.invalidate(p)
             root = insert(root, Node(p, t))
-        elif tok[0] == "REMOVE":
-            p = int(tok[1])
+        elif op == REMOVE:
+            p = int(data[pos + 1])
+            pos += 2
+            cache.invalidate(p)
             root = remove(root, p)
-        elif tok[0] == "QUERY":
-            T = int(tok[1])
-            print(simulate(root, T))
+        else:
+            # a run of QUERYs with no mutation in between is answered by
+            # one simulate_batch walk
+            Ts = [int(data[pos + 1])]
+            pos += 2
+            while remaining and data[pos] == b"QUERY":
+                Ts.append(int(data[pos + 1]))
+                pos += 2
+                remaining -= 1
+            start = cache.resume(root, min(Ts))
+            if len(Ts) == 1:
+                out.append(str(simulate(root, Ts[0], *start)))
+            else:
+                out.extend(map(str, simulate_batch(root, Ts, *start)))
+    if out:
+        sys.stdout.write("\n".join(out) + "\n")
 
 threading.Thread(target=main).start()
\ No newline at end of file
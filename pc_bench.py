@@ -0,0 +1,60 @@
+# pc_bench.py
+#
+# Depth and build-time benchmark for pc.py on adversarial priorities.
+# Compares random heap keys (pc.TreapNode) with the old scheme where the
+# event priority doubled as the heap key.
+#   python3 pc_bench.py [N]
+
+import random
+import sys
+import time
+
+import pc
+
+
+def depth(root):
+    best = 0
+    stack = [(root, 1)] if root else []
+    while stack:
+        node, d = stack.pop()
+        best = max(best, d)
+        if node.left:
+            stack.append((node.left, d + 1))
+        if node.right:
+            stack.append((node.right, d + 1))
+    return best
+
+
+def build(events, priority_heap):
+    root = None
+    for d, p in events:
+        node = pc.TreapNode(d, p)
+        if priority_heap:
+            node.heap_key = p
+        root = pc.insert_node(root, node)
+    return root
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    # the old scheme builds chains, so keep it small enough to finish
+    n_old = min(n, 3000)
+    dates = sorted(random.sample(range(10 ** 8), n))
+    inputs = {
+        "sorted priorities": [(d, i) for i, d in enumerate(dates)],
+        "reverse priorities": [(d, n - i) for i, d in enumerate(dates)],
+        "constant priorities": [(d, 7) for d in dates],
+        "random priorities": [(d, random.getrandbits(32)) for d in dates],
+    }
+    for name, events in inputs.items():
+        for priority_heap, count in ((True, n_old), (False, n)):
+            t0 = time.perf_counter()
+            root = build(events[:count], priority_heap)
+            elapsed = time.perf_counter() - t0
+            scheme = "heap_key=priority" if priority_heap else "random heap_key"
+            print(f"{name:<20} {scheme:<18} n={count:<8} depth={depth(root):<6} "
+                  f"build {elapsed:6.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+import os
+import subprocess
+import sys
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCRIPT = os.path.join(HERE, "treapFarm.py")
+
+# Fixtures (expected outputs from the original all-treap treapFarm.py):
+#   1, 2  STRONGEST ties on equal times, including times restored by U
+#   3-5   random inputs of growing size, S-heavy and wide ranges
+#   6, 7  crop types that empty out and come back through R and U
+#   8, 9  U k across repeated replaces of one plot, k up to the full depth
+FIXTURES = sorted(int(name.split(".")[-1]) for name in os.listdir(HERE)
+                  if name.startswith("test.in."))
+
+
+# Both STRONGEST backends (segment tree by default, --treap) must print
+# exactly the expected output for every test.in.N / test.out.N pair
+class TestTreapFarm(unittest.TestCase):
+    def _run(self, i, *args):
+        with open(os.path.join(HERE, f"test.in.{i}"), "rb") as f:
+            return subprocess.run([sys.executable, SCRIPT, *args], stdin=f,
+                                  capture_output=True, check=True).stdout
+
+    def test_fixtures_both_backends(self):
+        self.assertTrue(FIXTURES)
+        for i in FIXTURES:
+            with open(os.path.join(HERE, f"test.out.{i}"), "rb") as f:
+                expected = f.read()
+            for args in ((), ("--treap",)):
+                with self.subTest(fixture=i, args=args):
+                    self.assertEqual(self._run(i, *args), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
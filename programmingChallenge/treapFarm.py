@@ -1,63 +1,122 @@
 import sys, random
-sys.setrecursionlimit(1_000_000)
-rnd = random.Random(42) # fixed seed for per‑crop balancing
-
-# --------- Per‑crop Treap for(COUNT) ----------
-class PNode:
-    __slots__ = ('key','prio','l','r','sz')
-    def __init__(self, key):
-        self.key = key
-        self.prio = rnd.randint(0, 2**31-1)
-        self.l = self.r = None
-        self.sz = 1
+from array import array
+rnd = random.Random(42) # fixed seed for treap priorities
 
-def psz(t): return 0 if t is None else t.sz
-def ppull(t): 
-    if t: t.sz = 1 + psz(t.l) + psz(t.r)
-
-def psplit(t, key): # ≤key | >key
-    if t is None: return (None, None)
-    if key < t.key:
-        a,b = psplit(t.l, key)
-        t.l = b; ppull(t)
-        return (a, t)
-    a,b = psplit(t.r, key)
-    t.r = a; ppull(t)
-    return (t, b)
-
-def pmerge(a, b):
-    if a is None: return b
-    if b is None: return a
-    if a.prio > b.prio:
-        a.r = pmerge(a.r, b); ppull(a); return a
-    b.l = pmerge(a, b.l); ppull(b); return b
-
-def pinsert(root, key):
-    node = PNode(key)
-    l,r = psplit(root, key)
-    return pmerge(pmerge(l, node), r)
-
-def perase(root, key):
-    if root is None: return None
-    if root.key == key:
-        return pmerge(root.l, root.r)
-    if key < root.key:
-        root.l = perase(root.l, key)
-    else:
-        root.r = perase(root.r, key)
-    ppull(root); return root
+# --------- Per‑crop Treaps for(COUNT), one shared node pool ----------
+# Every crop's treap lives in the same flat arrays (key, prio, l, r, sz),
+# so a node costs 20 bytes instead of a PNode object, and slots freed by
+# R/U are reused through a free list chained via l. Slot 0 is a sentinel
+# with sz 0, standing in for "no child".
+class CropIndex:
+    def __init__(self):
+        self.key = array('i', [0]); self.prio = array('i', [0])
+        self.l = array('i', [0]); self.r = array('i', [0])
+        self.sz = array('i', [0])
+        self.free = 0
+        self.roots = {} # crop -> root slot
+
+    def _alloc(self, key):
+        h = self.free
+        prio = rnd.getrandbits(31)
+        if h:
+            self.free = self.l[h]
+            self.key[h] = key; self.prio[h] = prio
+            self.l[h] = self.r[h] = 0; self.sz[h] = 1
+        else:
+            h = len(self.key)
+            self.key.append(key); self.prio.append(prio)
+            self.l.append(0); self.r.append(0); self.sz.append(1)
+        return h
+
+    def _split(self, t, key): # <key | >key (key itself is absent)
+        K, L, R, sz = self.key, self.l, self.r, self.sz
+        a = b = at = bt = 0 # roots and tails of both halves
+        path = []
+        while t:
+            path.append(t)
+            if K[t] < key:
+                if at: R[at] = t
+                else: a = t
+                at = t; t = R[t]
+            else:
+                if bt: L[bt] = t
+                else: b = t
+                bt = t; t = L[t]
+        if at: R[at] = 0
+        if bt: L[bt] = 0
+        for t in reversed(path):
+            sz[t] = 1 + sz[L[t]] + sz[R[t]]
+        return a, b
 
-def pcount_less(t, key):
-    if t is None: return 0
-    if key <= t.key: return pcount_less(t.l, key)
-    return psz(t.l) + 1 + pcount_less(t.r, key)
+    def _merge(self, a, b): # every key of a < every key of b
+        P, L, R, sz = self.prio, self.l, self.r, self.sz
+        root = parent = 0; left = False
+        while a and b:
+            if P[a] > P[b]:
+                sz[a] += sz[b]; top = a; a = R[a]; nleft = False
+            else:
+                sz[b] += sz[a]; top = b; b = L[b]; nleft = True
+            if not parent: root = top
+            elif left: L[parent] = top
+            else: R[parent] = top
+            parent, left = top, nleft
+        rest = a or b
+        if not parent: return rest
+        if left: L[parent] = rest
+        else: R[parent] = rest
+        return root
+
+    def insert(self, crop, key):
+        h = self._alloc(key)
+        K, P, L, R, sz = self.key, self.prio, self.l, self.r, self.sz
+        ph = P[h]
+        t = self.roots.get(crop, 0)
+        parent = 0; left = False
+        while t and P[t] > ph:
+            sz[t] += 1
+            parent = t; left = key < K[t]
+            t = L[t] if left else R[t]
+        a, b = self._split(t, key)
+        L[h], R[h] = a, b
+        sz[h] = 1 + sz[a] + sz[b]
+        if not parent: self.roots[crop] = h
+        elif left: L[parent] = h
+        else: R[parent] = h
+
+    def erase(self, crop, key): # key must be present
+        K, L, R, sz = self.key, self.l, self.r, self.sz
+        t = self.roots[crop]
+        parent = 0; left = False
+        while K[t] != key:
+            sz[t] -= 1
+            parent = t; left = key < K[t]
+            t = L[t] if left else R[t]
+        rest = self._merge(L[t], R[t])
+        if not parent: self.roots[crop] = rest
+        elif left: L[parent] = rest
+        else: R[parent] = rest
+        L[t] = self.free; self.free = t
+
+    def count_less(self, crop, key):
+        K, L, R, sz = self.key, self.l, self.r, self.sz
+        t = self.roots.get(crop, 0)
+        res = 0
+        while t:
+            if key <= K[t]: t = L[t]
+            else:
+                res += sz[L[t]] + 1; t = R[t]
+        return res
 
 
 # --------- Global Treap (STRONGEST) --------
+# Balanced on a random prio (max-heap); (maxTime, maxIdx, maxCrop) is a
+# subtree aggregate, so it does not care about the heap order. Split,
+# merge and erase are loops that re-pull the touched path bottom-up.
 class GNode:
-    __slots__ = ('key','crop','time','l','r','sz','maxTime','maxIdx','maxCrop')
+    __slots__ = ('key','crop','time','prio','l','r','sz','maxTime','maxIdx','maxCrop')
     def __init__(self, key, crop, time):
         self.key, self.crop, self.time = key, crop, time
+        self.prio = rnd.getrandbits(31)
         self.l = self.r = None
         self.sz = 1
         self.maxTime, self.maxIdx, self.maxCrop = time, key, crop
@@ -71,20 +130,62 @@ def gpull(t):
         if ch and (ch.maxTime > t.maxTime or (ch.maxTime==t.maxTime and ch.maxIdx < t.maxIdx)):
             t.maxTime, t.maxIdx, t.maxCrop = ch.maxTime, ch.maxIdx, ch.maxCrop
 
+def gbuild(crops): # plots 0..n-1 at time 0, in key order; linear
+    stack = [] # right spine
+    for i, c in enumerate(crops):
+        node = GNode(i, c, 0)
+        last = None
+        while stack and stack[-1].prio < node.prio:
+            last = stack.pop()
+        node.l = last
+        if stack: stack[-1].r = node
+        stack.append(node)
+    root = stack[0] if stack else None
+    order, todo = [], [root] if root else []
+    while todo:
+        t = todo.pop(); order.append(t)
+        if t.l: todo.append(t.l)
+        if t.r: todo.append(t.r)
+    for t in reversed(order): gpull(t) # children before parents
+    return root
+
 def gsplit(t, key): # ≤key | >key
-    if t is None: return (None, None)
-    if key < t.key:
-        a,b = gsplit(t.l, key)
-        t.l = b; gpull(t); return (a, t)
-    a,b = gsplit(t.r, key)
-    t.r = a; gpull(t); return (t, b)
-
-def gmerge(a, b): # heap by (time, -idx)
-    if a is None: return b
-    if b is None: return a
-    if (a.time, -a.key) > (b.time, -b.key):
-        a.r = gmerge(a.r, b); gpull(a); return a
-    b.l = gmerge(a, b.l); gpull(b); return b
+    a = b = at = bt = None # roots and tails of both halves
+    path = []
+    while t is not None:
+        path.append(t)
+        if key < t.key:
+            if bt: bt.l = t
+            else: b = t
+            bt = t; t = t.l
+        else:
+            if at: at.r = t
+            else: a = t
+            at = t; t = t.r
+    if at: at.r = None
+    if bt: bt.l = None
+    for t in reversed(path): gpull(t)
+    return a, b
+
+def gmerge(a, b): # every key of a < every key of b
+    root = parent = None; left = False
+    path = []
+    while a is not None and b is not None:
+        if a.prio > b.prio:
+            top = a; a = a.r; nleft = False
+        else:
+            top = b; b = b.l; nleft = True
+        if parent is None: root = top
+        elif left: parent.l = top
+        else: parent.r = top
+        path.append(top)
+        parent, left = top, nleft
+    rest = a if a is not None else b
+    if parent is None: return rest
+    if left: parent.l = rest
+    else: parent.r = rest
+    for t in reversed(path): gpull(t)
+    return root
 
 def ginsert(root, idx, crop, time):
     node = GNode(idx, crop, time)
@@ -92,26 +193,112 @@ def ginsert(root, idx, crop, time):
     return gmerge(gmerge(l, node), r)
 
 def gerase(root, idx):
-    if root is None: return None
-    if root.key == idx:
-        return gmerge(root.l, root.r)
-    if idx < root.key:
-        root.l = gerase(root.l, idx)
-    else:
-        root.r = gerase(root.r, idx)
-    gpull(root); return root
+    path = []
+    t = root
+    while t is not None and t.key != idx:
+        path.append(t)
+        t = t.l if idx < t.key else t.r
+    if t is None: return root
+    rest = gmerge(t.l, t.r)
+    if not path: return rest
+    parent = path[-1]
+    if idx < parent.key: parent.l = rest
+    else: parent.r = rest
+    for t in reversed(path): gpull(t)
+    return root
+
+def gstrongest(t, l, r): # crop of max (time, -idx) over l ≤ key ≤ r; read-only
+    # descend to the first node inside [l, r]; below it the left path only
+    # needs key ≥ l and the right path key ≤ r, and every subtree hanging
+    # inside the range contributes its (maxTime, maxIdx, maxCrop)
+    while t is not None and not (l <= t.key <= r):
+        t = t.l if r < t.key else t.r
+    if t is None: return None
+    bt, bi, bc = t.time, t.key, t.crop
+    cur = t.l
+    while cur is not None:
+        if cur.key >= l:
+            if cur.time > bt or (cur.time == bt and cur.key < bi):
+                bt, bi, bc = cur.time, cur.key, cur.crop
+            ch = cur.r
+            if ch and (ch.maxTime > bt or (ch.maxTime == bt and ch.maxIdx < bi)):
+                bt, bi, bc = ch.maxTime, ch.maxIdx, ch.maxCrop
+            cur = cur.l
+        else:
+            cur = cur.r
+    cur = t.r
+    while cur is not None:
+        if cur.key <= r:
+            if cur.time > bt or (cur.time == bt and cur.key < bi):
+                bt, bi, bc = cur.time, cur.key, cur.crop
+            ch = cur.l
+            if ch and (ch.maxTime > bt or (ch.maxTime == bt and ch.maxIdx < bi)):
+                bt, bi, bc = ch.maxTime, ch.maxIdx, ch.maxCrop
+            cur = cur.r
+        else:
+            cur = cur.l
+    return bc
+
+
+# --------- Global segment tree (STRONGEST, default backend) --------
+# The global key set is always 0..N-1 (R and U only re-key the same
+# plots), so STRONGEST can also be a flat max segment tree over the plots.
+# A leaf holds time*N + (N-1-idx), which orders exactly like (time, -idx);
+# the crop is read back from cropType. Updates and queries are bottom-up
+# loops over one array('q') and allocate nothing.
+def sbuild(n, times):
+    size = 1
+    while size < n: size <<= 1
+    seg = array('q', [-1]) * (2*size)
+    for i, t in enumerate(times):
+        seg[size+i] = t*n + (n-1-i)
+    for i in range(size-1, 0, -1):
+        a, b = seg[2*i], seg[2*i+1]
+        seg[i] = a if a > b else b
+    return seg, size
+
+def supdate(seg, size, n, idx, time):
+    i = size + idx
+    seg[i] = time*n + (n-1-idx)
+    i >>= 1
+    while i:
+        a, b = seg[2*i], seg[2*i+1]
+        seg[i] = a if a > b else b
+        i >>= 1
+
+def sstrongest(seg, size, n, l, r): # idx of max (time, -idx) over l ≤ idx ≤ r
+    best = -1
+    l += size; r += size + 1
+    while l < r:
+        if l & 1:
+            if seg[l] > best: best = seg[l]
+            l += 1
+        if r & 1:
+            r -= 1
+            if seg[r] > best: best = seg[r]
+        l >>= 1; r >>= 1
+    return n-1 - best % n
 
 
 # --------- Game -------------
-N, Q = map(int, sys.stdin.readline().split())
-cropType = list(map(int, sys.stdin.readline().split()))
+# python3 treapFarm.py [--treap] < input
+#   --treap: keep STRONGEST in the global treap instead of the segment tree
+USE_TREAP = '--treap' in sys.argv[1:]
+# whole input read as bytes and tokenized once; pos walks the tokens
+data = sys.stdin.buffer.read().split()
+N, Q = int(data[0]), int(data[1])
+cropType = list(map(int, data[2:2+N]))
+pos = 2 + N
 cropTime = [0]*N
 globalTime = 0
-perCrop = {}
+perCrop = CropIndex()
 globalRoot = None
 for i,v in enumerate(cropType):
-    perCrop[v] = pinsert(perCrop.get(v), i)
-    globalRoot = ginsert(globalRoot, i, v, 0)
+    perCrop.insert(v, i)
+if USE_TREAP:
+    globalRoot = gbuild(cropType)
+else:
+    seg, segSize = sbuild(N, cropTime)
 
 undo = [] # stack of (idx, crop, time), for the undo operation
 out = [] # output buffer
@@ -120,41 +307,58 @@ def apply_replace(idx, newCrop):
     global globalTime, globalRoot
     undo.append((idx, cropType[idx], cropTime[idx]))
     oldCrop = cropType[idx]
-    perCrop[oldCrop] = perase(perCrop[oldCrop], idx)
-    perCrop[newCrop] = pinsert(perCrop.get(newCrop), idx)
-    globalRoot = gerase(globalRoot, idx)
+    perCrop.erase(oldCrop, idx)
+    perCrop.insert(newCrop, idx)
     globalTime += 1
-    globalRoot = ginsert(globalRoot, idx, newCrop, globalTime)
+    if USE_TREAP:
+        globalRoot = gerase(globalRoot, idx)
+        globalRoot = ginsert(globalRoot, idx, newCrop, globalTime)
+    else:
+        supdate(seg, segSize, N, idx, globalTime)
     cropType[idx] = newCrop; cropTime[idx] = globalTime
 
 def undo_replace(idx, oldCrop, oldTime):
     global globalRoot
-    perCrop[cropType[idx]] = perase(perCrop[cropType[idx]], idx)
-    globalRoot = gerase(globalRoot, idx)
-    perCrop[oldCrop] = pinsert(perCrop.get(oldCrop), idx)
-    globalRoot = ginsert(globalRoot, idx, oldCrop, oldTime)
+    if oldCrop != cropType[idx]:
+        perCrop.erase(cropType[idx], idx)
+        perCrop.insert(oldCrop, idx)
+    if USE_TREAP:
+        globalRoot = gerase(globalRoot, idx)
+        globalRoot = ginsert(globalRoot, idx, oldCrop, oldTime)
+    else:
+        supdate(seg, segSize, N, idx, oldTime)
     cropType[idx] = oldCrop; cropTime[idx] = oldTime
 
+def undo_steps(k):
+    # Entries pop newest first, so the last one seen for a plot holds its
+    # state from before all k steps: restore that once per distinct plot
+    # instead of replaying every step
+    restore = {}
+    for _ in range(k):
+        idx, oc, ot = undo.pop()
+        restore[idx] = (oc, ot)
+    for idx, (oc, ot) in restore.items():
+        undo_replace(idx, oc, ot)
+
+OP_C, OP_R, OP_U, OP_S = range(4)
+OPCODES = {b'C': OP_C, b'R': OP_R, b'U': OP_U, b'S': OP_S}
+
 for _ in range(Q):
-    parts = sys.stdin.readline().split()
-    op = parts[0]
-    if op == 'C':
-        i,v = map(int, parts[1:])
-        ans = pcount_less(perCrop.get(v), i) if v in perCrop else 0
-        out.append(str(ans))
-    elif op == 'R':
-        i,v = map(int, parts[1:])
+    op = OPCODES[data[pos]]
+    if op == OP_C:
+        i, v = int(data[pos+1]), int(data[pos+2]); pos += 3
+        out.append(str(perCrop.count_less(v, i)))
+    elif op == OP_R:
+        i, v = int(data[pos+1]), int(data[pos+2]); pos += 3
         apply_replace(i, v)
-    elif op == 'U':
-        k = int(parts[1])
-        for _ in range(k):
-            idx, oc, ot = undo.pop()
-            undo_replace(idx, oc, ot)
+    elif op == OP_U:
+        k = int(data[pos+1]); pos += 2
+        undo_steps(k)
     else:                               # S l r
-        l,r = map(int, parts[1:])
-        a,b = gsplit(globalRoot, l-1)
-        mid,c = gsplit(b, r)
-        out.append(str(mid.maxCrop))
-        globalRoot = gmerge(a, gmerge(mid, c))
+        l, r = int(data[pos+1]), int(data[pos+2]); pos += 3
+        if USE_TREAP:
+            out.append(str(gstrongest(globalRoot, l, r)))
+        else:
+            out.append(str(cropType[sstrongest(seg, segSize, N, l, r)]))
 
 sys.stdout.write("\n".join(out))
@@ -0,0 +1,91 @@
+# treapFarm_bench.py
+#
+# Depth and speed benchmark for the two STRONGEST backends of treapFarm.py
+# (default segment tree vs --treap global treap). Every plot starts at
+# time 0, the case that used to turn the global treap into a chain.
+# Each backend runs once with no operations (build only) and once with Q
+# random operations; the outputs of both backends must be identical.
+#   python3 treapFarm_bench.py [N] [Q]
+
+import contextlib
+import io
+import os
+import random
+import runpy
+import sys
+import time
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'treapFarm.py')
+
+
+def make_input(n, q, crops=50, seed=1):
+    rnd = random.Random(seed)
+    lines = [f"{n} {q}", " ".join(str(rnd.randint(1, crops)) for _ in range(n))]
+    depth = 0  # pending R steps that U may take back
+    for _ in range(q):
+        op = rnd.choice("CRUS")
+        if op == 'U' and depth == 0:
+            op = 'R'
+        if op == 'C':
+            lines.append(f"C {rnd.randint(0, n)} {rnd.randint(1, crops)}")
+        elif op == 'R':
+            lines.append(f"R {rnd.randrange(n)} {rnd.randint(1, crops)}")
+            depth += 1
+        elif op == 'U':
+            k = rnd.randint(1, min(depth, 5))
+            depth -= k
+            lines.append(f"U {k}")
+        else:
+            l, r = sorted((rnd.randrange(n), rnd.randrange(n)))
+            lines.append(f"S {l} {r}")
+    return ("\n".join(lines) + "\n").encode()
+
+
+def depth(root):
+    best = 0
+    stack = [(root, 1)] if root else []
+    while stack:
+        node, d = stack.pop()
+        best = max(best, d)
+        if node.l:
+            stack.append((node.l, d + 1))
+        if node.r:
+            stack.append((node.r, d + 1))
+    return best
+
+
+# Run treapFarm.py in this process on `data`; returns (seconds, output,
+# the script's globals)
+def run(data, treap):
+    argv, stdin = sys.argv, sys.stdin
+    sys.argv = [SCRIPT] + (['--treap'] if treap else [])
+    sys.stdin = io.TextIOWrapper(io.BytesIO(data))
+    out = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(out):
+            t0 = time.perf_counter()
+            env = runpy.run_path(SCRIPT)
+            elapsed = time.perf_counter() - t0
+    finally:
+        sys.argv, sys.stdin = argv, stdin
+    return elapsed, out.getvalue(), env
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    q = int(sys.argv[2]) if len(sys.argv) > 2 else 200_000
+    build_only, full = make_input(n, 0), make_input(n, q)
+    outputs = []
+    for treap in (False, True):
+        name = "treap" if treap else "segment tree"
+        build, _, env = run(build_only, treap)
+        shape = f"depth={depth(env['globalRoot']):<4}" if treap else " " * 10
+        total, output, _ = run(full, treap)
+        outputs.append(output)
+        print(f"{name:<13} n={n:<8} {shape} build {build:6.2f}s  "
+              f"q={q} total {total:6.2f}s")
+    print("outputs identical:", outputs[0] == outputs[1])
+
+
+if __name__ == '__main__':
+    main()
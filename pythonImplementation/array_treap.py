@@ -0,0 +1,376 @@
+import random
+from array import array
+from itertools import islice
+
+# Handle used for "no child" / empty tree. Real handles are >= 0, so hot
+# loops test `h >= 0` (a compare against a constant) instead of `!= NIL`
+NIL = -1
+
+
+# Struct-of-arrays node storage: node h lives at index h of every array.
+# Per key this costs 8 (key, int64) + 8 (priority, double)
+# + 4 + 4 (left/right handles, int32) = 24 bytes, plus the arrays'
+# amortised over-allocation, measured at ~25.1 bytes per key (tracemalloc,
+# 200k random keys) versus ~96 bytes per key for treap.Node objects.
+class NodePool:
+    __slots__ = ("key", "priority", "left", "right", "free")
+
+    def __init__(self):
+        self.key = array("q")
+        self.priority = array("d")
+        self.left = array("i")
+        self.right = array("i")
+        # Head of the free list; freed slots are chained through `left`
+        self.free = NIL
+
+    def __len__(self):
+        return len(self.key)
+
+    # Take a slot from the free list, or grow the arrays by one
+    def alloc(self, key, priority=None):
+        if priority is None:
+            priority = random.random()
+        h = self.free
+        if h != NIL:
+            self.free = self.left[h]
+            self.key[h] = key
+            self.priority[h] = priority
+            self.left[h] = NIL
+            self.right[h] = NIL
+            return h
+        h = len(self.key)
+        self.key.append(key)
+        self.priority.append(priority)
+        self.left.append(NIL)
+        self.right.append(NIL)
+        return h
+
+    # Return a slot to the free list so the next alloc reuses it
+    def release(self, h):
+        self.left[h] = self.free
+        self.free = h
+
+
+# Treap over a NodePool; same public surface as treap.Treap, but nodes
+# are int handles into the pool instead of Node objects.
+# Treaps produced by split share their parent's pool.
+# This backend trades speed for memory: every array read boxes a fresh
+# int or float, where a __slots__ Node attribute load allocates nothing.
+# runtime_test.py, uniform keys, CPython 3.11, ops/s vs treap.Treap:
+#   n=200k  insert ~101k vs 109k, search ~157k vs 229k, delete ~121k vs 134k
+#   n=1k    insert ~213k vs 450k, search ~490k vs 1.25M, delete ~287k vs 646k
+class ArrayTreap:
+    def __init__(self, pool=None):
+        self.pool = pool if pool is not None else NodePool()
+        self.root = NIL
+
+    # Iterative insert: record the descent path, then rotate the new
+    # leaf up while its priority beats the parent's
+    def _insert(self, node, key, priority=None):
+        pool = self.pool
+        keys, prio, left, right = pool.key, pool.priority, pool.left, pool.right
+        path = []
+        cur = node
+        while cur >= 0:
+            k = keys[cur]
+            if key < k:
+                path.append(cur)
+                cur = left[cur]
+            elif key > k:
+                path.append(cur)
+                cur = right[cur]
+            else:
+                return node  # Key already present
+
+        # pool.alloc, inlined
+        p = priority if priority is not None else random.random()
+        cur = pool.free
+        if cur >= 0:
+            pool.free = left[cur]
+            keys[cur] = key
+            prio[cur] = p
+            left[cur] = right[cur] = NIL
+        else:
+            cur = len(keys)
+            keys.append(key)
+            prio.append(p)
+            left.append(NIL)
+            right.append(NIL)
+        while path:
+            parent = path.pop()
+            if key < keys[parent]:
+                left[parent] = cur
+                if p >= prio[parent]:
+                    return node
+                # Rotate right: cur becomes parent of `parent`
+                left[parent] = right[cur]
+                right[cur] = parent
+            else:
+                right[parent] = cur
+                if p >= prio[parent]:
+                    return node
+                # Rotate left
+                right[parent] = left[cur]
+                left[cur] = parent
+        return cur
+
+    def insert(self, key, priority=None):
+        self.root = self._insert(self.root, key, priority)
+
+    # Replace the deleted node by the merge of its children and free its slot
+    def _delete(self, node, key):
+        keys, left, right = self.pool.key, self.pool.left, self.pool.right
+        parent = NIL
+        cur = node
+        while cur >= 0:
+            k = keys[cur]
+            if key == k:
+                break
+            parent = cur
+            cur = left[cur] if key < k else right[cur]
+        if cur < 0:
+            return node
+
+        sub = self._merge_nodes(left[cur], right[cur])
+        left[cur] = self.pool.free  # pool.release, inlined
+        self.pool.free = cur
+        if parent == NIL:
+            return sub
+        if left[parent] == cur:
+            left[parent] = sub
+        else:
+            right[parent] = sub
+        return node
+
+    def delete(self, key):
+        self.root = self._delete(self.root, key)
+
+    def search(self, key):
+        keys, left, right = self.pool.key, self.pool.left, self.pool.right
+        cur = self.root
+        while cur >= 0:
+            k = keys[cur]
+            if key < k:
+                cur = left[cur]
+            elif key > k:
+                cur = right[cur]
+            else:
+                return True
+        return False
+
+    # Left gets keys < key, right gets keys >= key (top-down, no recursion)
+    def _split(self, node, key):
+        keys, left, right = self.pool.key, self.pool.left, self.pool.right
+        left_root = right_root = NIL
+        left_tail = right_tail = NIL
+        while node >= 0:
+            if key <= keys[node]:
+                if right_tail == NIL:
+                    right_root = node
+                else:
+                    left[right_tail] = node
+                right_tail = node
+                node = left[node]
+            else:
+                if left_tail == NIL:
+                    left_root = node
+                else:
+                    right[left_tail] = node
+                left_tail = node
+                node = right[node]
+        if left_tail != NIL:
+            right[left_tail] = NIL
+        if right_tail != NIL:
+            left[right_tail] = NIL
+        return (left_root, right_root)
+
+    def split(self, key):
+        L, R = self._split(self.root, key)
+        left_t, right_t = ArrayTreap(self.pool), ArrayTreap(self.pool)
+        left_t.root, right_t.root = L, R
+        return (left_t, right_t)
+
+    # Merge two subtrees, all keys of `a` < all keys of `b`
+    def _merge_nodes(self, a, b):
+        if a == NIL:
+            return b
+        if b == NIL:
+            return a
+        prio, left, right = self.pool.priority, self.pool.left, self.pool.right
+        root = parent = NIL
+        hook_right = False
+        while a >= 0 and b >= 0:
+            if prio[a] < prio[b]:
+                nxt = a
+                a = right[a]
+                next_hook_right = True
+            else:
+                nxt = b
+                b = left[b]
+                next_hook_right = False
+            if parent == NIL:
+                root = nxt
+            elif hook_right:
+                right[parent] = nxt
+            else:
+                left[parent] = nxt
+            parent, hook_right = nxt, next_hook_right
+
+        rest = a if a != NIL else b
+        if hook_right:
+            right[parent] = rest
+        else:
+            left[parent] = rest
+        return root
+
+    # Copy the subtree at `node` of `src` into this treap's pool, keeping
+    # keys, priorities and shape; returns the new root handle
+    def _import(self, src, node):
+        if node == NIL:
+            return NIL
+        pool = self.pool
+        skeys, sprio, sleft, sright = src.key, src.priority, src.left, src.right
+        left, right = pool.left, pool.right
+        new_root = pool.alloc(skeys[node], sprio[node])
+        stack = [(node, new_root)]
+        while stack:
+            old, new = stack.pop()
+            l, r = sleft[old], sright[old]
+            if l != NIL:
+                h = pool.alloc(skeys[l], sprio[l])
+                left[new] = h
+                stack.append((l, h))
+            if r != NIL:
+                h = pool.alloc(skeys[r], sprio[r])
+                right[new] = h
+                stack.append((r, h))
+        return new_root
+
+    # Merge two treaps whose keys are ordered (left < right). Treaps from
+    # the same pool are linked in place; otherwise right is copied over.
+    @staticmethod
+    def merge(left_treap: "ArrayTreap", right_treap: "ArrayTreap") -> "ArrayTreap":
+        t = ArrayTreap(left_treap.pool)
+        right_root = right_treap.root
+        if right_treap.pool is not t.pool:
+            right_root = t._import(right_treap.pool, right_root)
+        t.root = t._merge_nodes(left_treap.root, right_root)
+        return t
+
+    # Link key-sorted handles into a treap in O(n) (Cartesian tree build)
+    def _build_sorted_nodes(self, handles):
+        prio, left, right = self.pool.priority, self.pool.left, self.pool.right
+        stack = []
+        for h in handles:
+            last = NIL
+            p = prio[h]
+            while stack and prio[stack[-1]] > p:
+                last = stack.pop()
+            left[h] = last
+            right[h] = NIL
+            if stack:
+                right[stack[-1]] = h
+            stack.append(h)
+        return stack[0] if stack else NIL
+
+    # Build a treap from ascending keys in O(n); repeated keys are skipped
+    @classmethod
+    def from_sorted(cls, keys, pool=None):
+        t = cls(pool)
+        alloc = t.pool.alloc
+        handles = []
+        prev = None
+        for key in keys:
+            if handles and key <= prev:
+                if key == prev:
+                    continue
+                raise ValueError("from_sorted requires keys in ascending order")
+            handles.append(alloc(key))
+            prev = key
+        t.root = t._build_sorted_nodes(handles)
+        return t
+
+    # Yield the handles of a subtree in key order (explicit stack)
+    def _iter_nodes(self, node):
+        left, right = self.pool.left, self.pool.right
+        stack = []
+        cur = node
+        while cur != NIL or stack:
+            while cur != NIL:
+                stack.append(cur)
+                cur = left[cur]
+            cur = stack.pop()
+            yield cur
+            cur = right[cur]
+
+    # Sort the batch, merge it with the existing handles in key order and
+    # relink everything in one pass, O(n + m log m)
+    def insert_many(self, keys):
+        batch = sorted(set(keys))
+        if not batch:
+            return
+        pool = self.pool
+        pkeys, alloc = pool.key, pool.alloc
+        merged = []
+        i, m = 0, len(batch)
+        for h in self._iter_nodes(self.root):
+            k = pkeys[h]
+            while i < m and batch[i] < k:
+                merged.append(alloc(batch[i]))
+                i += 1
+            if i < m and batch[i] == k:
+                i += 1
+            merged.append(h)
+        merged.extend(alloc(key) for key in batch[i:])
+        self.root = self._build_sorted_nodes(merged)
+
+    # In-order traversal for sorted keys; `node` is a handle (default root)
+    def inorder(self, node=None):
+        if node is None:
+            node = self.root
+        keys, left, right = self.pool.key, self.pool.left, self.pool.right
+        res = []
+        stack = []
+        cur = node
+        while cur != NIL or stack:
+            while cur != NIL:
+                stack.append(cur)
+                cur = left[cur]
+            cur = stack.pop()
+            res.append(keys[cur])
+            cur = right[cur]
+        return res
+
+    def __iter__(self):
+        return self.irange()
+
+    # Lazily yield keys with lo <= key <= hi (None = unbounded), ascending
+    # or descending, with O(depth) memory
+    def irange(self, lo=None, hi=None, reverse=False):
+        keys, left, right = self.pool.key, self.pool.left, self.pool.right
+        # Walk mirrored for reverse: "near" is the side visited first
+        near, far = (right, left) if reverse else (left, right)
+        start, stop = (hi, lo) if reverse else (lo, hi)
+        sign = -1 if reverse else 1
+        stack = []
+        cur = self.root
+        while cur != NIL:
+            if start is not None and sign * (keys[cur] - start) < 0:
+                cur = far[cur]
+            else:
+                stack.append(cur)
+                cur = near[cur]
+        while stack:
+            h = stack.pop()
+            k = keys[h]
+            if stop is not None and sign * (k - stop) > 0:
+                return
+            yield k
+            cur = far[h]
+            while cur != NIL:
+                stack.append(cur)
+                cur = near[cur]
+
+    # Keys at in-order positions [start, stop), lazily
+    def islice(self, start=0, stop=None, reverse=False):
+        return islice(self.irange(reverse=reverse), start, stop)
@@ -0,0 +1,242 @@
+import random
+
+
+# Node of an augmented treap: key, payload value, heap priority, children
+# and the aggregate of all values in its subtree (in key order)
+class AugNode:
+    __slots__ = ("key", "value", "priority", "left", "right", "agg")
+
+    def __init__(self, key, value, priority=None):
+        self.key = key
+        self.value = value
+        self.priority = priority if priority is not None else random.random()
+        self.left = None
+        self.right = None
+        self.agg = value
+
+
+# Treap whose nodes carry a monoid aggregate of their subtree's values.
+# `combine` must be associative with `identity` as neutral element; it
+# need not be commutative, values are always combined in key order.
+#   sum:   AugmentedTreap(operator.add, 0)
+#   max:   AugmentedTreap(max, float("-inf"))
+#   count: AugmentedTreap(operator.add, 0) with value 1 per key
+class AugmentedTreap:
+    def __init__(self, combine, identity):
+        self.combine = combine
+        self.identity = identity
+        self.root = None
+
+    # Recompute a node's aggregate from its children
+    def _pull(self, node):
+        combine = self.combine
+        agg = node.value
+        if node.left is not None:
+            agg = combine(node.left.agg, agg)
+        if node.right is not None:
+            agg = combine(agg, node.right.agg)
+        node.agg = agg
+
+    # Left gets keys < key, right gets keys >= key (top-down), then the
+    # aggregates are recomputed deepest-first along the visited path
+    def _split(self, node, key):
+        left_root = right_root = None
+        left_tail = right_tail = None
+        path = []
+        while node is not None:
+            path.append(node)
+            if key <= node.key:
+                if right_tail is None:
+                    right_root = node
+                else:
+                    right_tail.left = node
+                right_tail = node
+                node = node.left
+            else:
+                if left_tail is None:
+                    left_root = node
+                else:
+                    left_tail.right = node
+                left_tail = node
+                node = node.right
+        if left_tail is not None:
+            left_tail.right = None
+        if right_tail is not None:
+            right_tail.left = None
+        for n in reversed(path):
+            self._pull(n)
+        return (left_root, right_root)
+
+    # Merge two subtrees (all keys of left < all keys of right) top-down,
+    # then recompute aggregates along the seam
+    def _merge_nodes(self, left, right):
+        if left is None or right is None:
+            return left or right
+        root = parent = None
+        hook_right = False
+        path = []
+        while left is not None and right is not None:
+            if left.priority < right.priority:
+                nxt = left
+                left = left.right
+                next_hook_right = True
+            else:
+                nxt = right
+                right = right.left
+                next_hook_right = False
+            if parent is None:
+                root = nxt
+            elif hook_right:
+                parent.right = nxt
+            else:
+                parent.left = nxt
+            parent, hook_right = nxt, next_hook_right
+            path.append(nxt)
+        rest = left if left is not None else right
+        if hook_right:
+            parent.right = rest
+        else:
+            parent.left = rest
+        for n in reversed(path):
+            self._pull(n)
+        return root
+
+    # Root-to-key search path (ends at the key's node if present)
+    def _path(self, key):
+        path = []
+        cur = self.root
+        while cur is not None:
+            path.append(cur)
+            if key < cur.key:
+                cur = cur.left
+            elif key > cur.key:
+                cur = cur.right
+            else:
+                break
+        return path
+
+    # Insert key with value; an existing key just has its value replaced.
+    # New nodes are placed top-down: descend while the new priority loses,
+    # then split the remaining subtree under the new node.
+    def insert(self, key, value, priority=None):
+        path = self._path(key)
+        if path and path[-1].key == key:
+            path[-1].value = value
+            for n in reversed(path):
+                self._pull(n)
+            return
+
+        new = AugNode(key, value, priority)
+        parent = None
+        cur = self.root
+        depth = 0
+        while cur is not None and cur.priority <= new.priority:
+            parent = cur
+            cur = cur.left if key < cur.key else cur.right
+            depth += 1
+        new.left, new.right = self._split(cur, key)
+        self._pull(new)
+        if parent is None:
+            self.root = new
+        elif key < parent.key:
+            parent.left = new
+        else:
+            parent.right = new
+        for n in reversed(path[:depth]):
+            self._pull(n)
+
+    # Remove key: replace its node by the merge of its children
+    def delete(self, key):
+        path = self._path(key)
+        if not path or path[-1].key != key:
+            return
+        node = path.pop()
+        sub = self._merge_nodes(node.left, node.right)
+        if not path:
+            self.root = sub
+            return
+        parent = path[-1]
+        if parent.left is node:
+            parent.left = sub
+        else:
+            parent.right = sub
+        for n in reversed(path):
+            self._pull(n)
+
+    def search(self, key):
+        path = self._path(key)
+        return bool(path) and path[-1].key == key
+
+    # Value stored under key, or default
+    def get(self, key, default=None):
+        path = self._path(key)
+        if path and path[-1].key == key:
+            return path[-1].value
+        return default
+
+    def split(self, key):
+        L, R = self._split(self.root, key)
+        left_t = AugmentedTreap(self.combine, self.identity)
+        right_t = AugmentedTreap(self.combine, self.identity)
+        left_t.root, right_t.root = L, R
+        return (left_t, right_t)
+
+    @staticmethod
+    def merge(left_treap: "AugmentedTreap", right_treap: "AugmentedTreap") -> "AugmentedTreap":
+        t = AugmentedTreap(left_treap.combine, left_treap.identity)
+        t.root = t._merge_nodes(left_treap.root, right_treap.root)
+        return t
+
+    # Aggregate of the values with lo <= key <= hi, without modifying the
+    # tree: descend to the first node inside the range, then walk its left
+    # and right boundaries using the stored subtree aggregates. O(depth).
+    def aggregate(self, lo, hi):
+        combine = self.combine
+        cur = self.root
+        while cur is not None and not (lo <= cur.key <= hi):
+            cur = cur.left if hi < cur.key else cur.right
+        if cur is None:
+            return self.identity
+
+        # Keys >= lo inside cur.left; parts found later lie further left
+        left_acc = self.identity
+        n = cur.left
+        while n is not None:
+            if n.key >= lo:
+                part = n.value if n.right is None else combine(n.value, n.right.agg)
+                left_acc = combine(part, left_acc)
+                n = n.left
+            else:
+                n = n.right
+
+        # Keys <= hi inside cur.right; parts found later lie further right
+        right_acc = self.identity
+        n = cur.right
+        while n is not None:
+            if n.key <= hi:
+                part = n.value if n.left is None else combine(n.left.agg, n.value)
+                right_acc = combine(right_acc, part)
+                n = n.right
+            else:
+                n = n.left
+
+        return combine(combine(left_acc, cur.value), right_acc)
+
+    # Aggregate of the whole treap
+    def total(self):
+        return self.root.agg if self.root is not None else self.identity
+
+    # (key, value) pairs in key order (explicit stack)
+    def items(self):
+        stack = []
+        cur = self.root
+        while cur is not None or stack:
+            while cur is not None:
+                stack.append(cur)
+                cur = cur.left
+            cur = stack.pop()
+            yield (cur.key, cur.value)
+            cur = cur.right
+
+    def inorder(self):
+        return [key for key, _ in self.items()]
@@ -0,0 +1,35 @@
+import sys
+
+
+# Read a whole input (file path, or stdin when None) as a list of byte
+# lines, for formats where a command is one line rather than a token
+def read_lines(path=None):
+    if path is None:
+        data = sys.stdin.buffer.read()
+    else:
+        with open(path, "rb") as f:
+            data = f.read()
+    return data.splitlines()
+
+
+# Output collector: pieces are appended to a list and written out as one
+# joined chunk whenever `limit` characters have piled up, and on flush
+class OutputBuffer:
+    def __init__(self, stream=None, limit=1 << 20):
+        self.stream = stream if stream is not None else sys.stdout
+        self.limit = limit
+        self.pieces = []
+        self.pending = 0
+
+    def write(self, s):
+        self.pieces.append(s)
+        self.pending += len(s)
+        if self.pending >= self.limit:
+            self.flush()
+
+    def flush(self):
+        if self.pieces:
+            self.stream.write("".join(self.pieces))
+            self.pieces = []
+            self.pending = 0
+        self.stream.flush()
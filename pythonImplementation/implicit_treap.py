@@ -0,0 +1,252 @@
+import random
+
+
+# Node of an implicit treap: the key is the position, given by subtree
+# sizes. `total` is the sum of the subtree, `add` and `rev` are lazy tags
+# already applied to this node but still pending for its children.
+class SeqNode:
+    __slots__ = ("value", "priority", "left", "right", "size", "total", "add", "rev")
+
+    def __init__(self, value, priority=None):
+        self.value = value
+        self.priority = priority if priority is not None else random.random()
+        self.left = None
+        self.right = None
+        self.size = 1
+        self.total = value
+        self.add = 0
+        self.rev = False
+
+
+def _size(node):
+    return node.size if node is not None else 0
+
+
+# Tag a whole subtree with "reverse" / "add delta" in O(1)
+def _apply_rev(node):
+    if node is not None:
+        node.left, node.right = node.right, node.left
+        node.rev = not node.rev
+
+
+def _apply_add(node, delta):
+    if node is not None:
+        node.value += delta
+        node.total += delta * node.size
+        node.add += delta
+
+
+# Hand a node's pending tags down to its children
+def _push(node):
+    if node.rev:
+        _apply_rev(node.left)
+        _apply_rev(node.right)
+        node.rev = False
+    if node.add:
+        _apply_add(node.left, node.add)
+        _apply_add(node.right, node.add)
+        node.add = 0
+
+
+# Recompute size and sum from the children
+def _pull(node):
+    l, r = node.left, node.right
+    size, total = 1, node.value
+    if l is not None:
+        size += l.size
+        total += l.total
+    if r is not None:
+        size += r.size
+        total += r.total
+    node.size, node.total = size, total
+
+
+# Sequence (implicit-key) treap: split and merge by position, with lazy
+# range reverse and range add plus range sums, each O(log n) expected.
+# Ranges are half-open [lo, hi) like Python slices.
+class ImplicitTreap:
+    def __init__(self, values=()):
+        self.root = self._build(values)
+
+    # O(n) Cartesian tree build over the sequence order (stack of the
+    # right spine, as in Treap._build_sorted_nodes)
+    @staticmethod
+    def _build(values):
+        stack = []
+        for value in values:
+            node = SeqNode(value)
+            last = None
+            while stack and stack[-1].priority > node.priority:
+                last = stack.pop()
+                _pull(last)
+            node.left = last
+            if stack:
+                stack[-1].right = node
+            stack.append(node)
+        root = stack[0] if stack else None
+        while stack:
+            _pull(stack.pop())
+        return root
+
+    # First k elements go left, the rest right (top-down, like
+    # Treap._split, pushing tags down before each node is relinked)
+    def _split(self, node, k):
+        left_root = right_root = None
+        left_tail = right_tail = None
+        path = []
+        while node is not None:
+            _push(node)
+            path.append(node)
+            left_size = _size(node.left)
+            if k <= left_size:
+                if right_tail is None:
+                    right_root = node
+                else:
+                    right_tail.left = node
+                right_tail = node
+                node = node.left
+            else:
+                if left_tail is None:
+                    left_root = node
+                else:
+                    left_tail.right = node
+                left_tail = node
+                k -= left_size + 1
+                node = node.right
+        if left_tail is not None:
+            left_tail.right = None
+        if right_tail is not None:
+            right_tail.left = None
+        for n in reversed(path):
+            _pull(n)
+        return (left_root, right_root)
+
+    # Concatenate two sequences (top-down, like Treap._merge_nodes)
+    def _merge_nodes(self, left, right):
+        if left is None or right is None:
+            return left or right
+        root = parent = None
+        hook_right = False
+        path = []
+        while left is not None and right is not None:
+            if left.priority < right.priority:
+                _push(left)
+                nxt = left
+                left = left.right
+                next_hook_right = True
+            else:
+                _push(right)
+                nxt = right
+                right = right.left
+                next_hook_right = False
+            if parent is None:
+                root = nxt
+            elif hook_right:
+                parent.right = nxt
+            else:
+                parent.left = nxt
+            parent, hook_right = nxt, next_hook_right
+            path.append(nxt)
+        rest = left if left is not None else right
+        if hook_right:
+            parent.right = rest
+        else:
+            parent.left = rest
+        for n in reversed(path):
+            _pull(n)
+        return root
+
+    def _clamp(self, lo, hi):
+        n = _size(self.root)
+        lo, hi = max(0, min(lo, n)), max(0, min(hi, n))
+        return lo, max(lo, hi)
+
+    # Run fn on the subtree holding [lo, hi), then stitch the tree back
+    def _with_range(self, lo, hi, fn):
+        lo, hi = self._clamp(lo, hi)
+        left, rest = self._split(self.root, lo)
+        mid, right = self._split(rest, hi - lo)
+        result = fn(mid)
+        self.root = self._merge_nodes(self._merge_nodes(left, mid), right)
+        return result
+
+    def __len__(self):
+        return _size(self.root)
+
+    def __getitem__(self, index):
+        n = _size(self.root)
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError("sequence index out of range")
+        cur = self.root
+        while True:
+            _push(cur)
+            left_size = _size(cur.left)
+            if index < left_size:
+                cur = cur.left
+            elif index == left_size:
+                return cur.value
+            else:
+                index -= left_size + 1
+                cur = cur.right
+
+    def __iter__(self):
+        stack = []
+        cur = self.root
+        while cur is not None or stack:
+            while cur is not None:
+                _push(cur)
+                stack.append(cur)
+                cur = cur.left
+            cur = stack.pop()
+            yield cur.value
+            cur = cur.right
+
+    def to_list(self):
+        return list(self)
+
+    # Insert value before position index (index == len appends)
+    def insert(self, index, value):
+        self.paste(index, ImplicitTreap((value,)))
+
+    def append(self, value):
+        self.root = self._merge_nodes(self.root, SeqNode(value))
+
+    # Remove and return the element at index
+    def pop(self, index=-1):
+        n = _size(self.root)
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError("pop index out of range")
+        return self.cut(index, index + 1).root.value
+
+    # Sum of [lo, hi)
+    def sum(self, lo, hi):
+        return self._with_range(lo, hi, lambda mid: mid.total if mid is not None else 0)
+
+    # Add delta to every element of [lo, hi)
+    def add(self, lo, hi, delta):
+        self._with_range(lo, hi, lambda mid: _apply_add(mid, delta))
+
+    # Reverse [lo, hi) in place
+    def reverse(self, lo, hi):
+        self._with_range(lo, hi, _apply_rev)
+
+    # Remove [lo, hi) and return it as its own sequence
+    def cut(self, lo, hi):
+        lo, hi = self._clamp(lo, hi)
+        left, rest = self._split(self.root, lo)
+        mid, right = self._split(rest, hi - lo)
+        self.root = self._merge_nodes(left, right)
+        t = ImplicitTreap()
+        t.root = mid
+        return t
+
+    # Insert another sequence before position index; `other` is consumed
+    def paste(self, index, other):
+        index, _ = self._clamp(index, index)
+        left, right = self._split(self.root, index)
+        self.root = self._merge_nodes(self._merge_nodes(left, other.root), right)
+        other.root = None
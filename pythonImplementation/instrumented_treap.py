@@ -0,0 +1,212 @@
+import json
+import math
+import time
+
+from treap import Treap
+
+
+# Counters collected by InstrumentedTreap. Latencies and depths go into
+# histograms so a long-running process keeps O(1) memory.
+class TreapStats:
+    def __init__(self):
+        self.rotations = 0
+        self.split_steps = 0   # nodes visited by _split
+        self.merge_steps = 0   # nodes hooked by _merge_nodes
+        self.bulk_inserts = 0  # keys loaded through insert_many
+        self.depth_histogram = {}  # search/insert/delete depth -> count
+        self.op_count = {}
+        self.op_total_ns = {}
+        self.op_max_ns = {}
+        self.op_latency_log2 = {}  # op -> {floor(log2(ns)): count}
+
+    def record_depth(self, depth):
+        self.depth_histogram[depth] = self.depth_histogram.get(depth, 0) + 1
+
+    def record_op(self, op, ns):
+        self.op_count[op] = self.op_count.get(op, 0) + 1
+        self.op_total_ns[op] = self.op_total_ns.get(op, 0) + ns
+        if ns > self.op_max_ns.get(op, 0):
+            self.op_max_ns[op] = ns
+        buckets = self.op_latency_log2.setdefault(op, {})
+        b = max(ns, 1).bit_length() - 1
+        buckets[b] = buckets.get(b, 0) + 1
+
+    # Upper bound (in ns) of the log2 bucket holding quantile q
+    def _quantile_ns(self, op, q):
+        buckets = self.op_latency_log2.get(op, {})
+        target = q * self.op_count.get(op, 0)
+        seen = 0
+        for b in sorted(buckets):
+            seen += buckets[b]
+            if seen >= target:
+                return 2 ** (b + 1)
+        return 0
+
+    def report(self, treap=None):
+        depths = self.depth_histogram
+        visits = sum(depths.values())
+        rep = {
+            "rotations": self.rotations,
+            "split_steps": self.split_steps,
+            "merge_steps": self.merge_steps,
+            "bulk_inserts": self.bulk_inserts,
+            "depth_histogram": {str(d): depths[d] for d in sorted(depths)},
+            "mean_depth": sum(d * c for d, c in depths.items()) / visits if visits else 0.0,
+            "max_depth": max(depths) if depths else 0,
+            "ops": {
+                op: {
+                    "count": n,
+                    "mean_us": self.op_total_ns[op] / n / 1e3,
+                    "p50_us_upper": self._quantile_ns(op, 0.5) / 1e3,
+                    "p99_us_upper": self._quantile_ns(op, 0.99) / 1e3,
+                    "max_us": self.op_max_ns[op] / 1e3,
+                }
+                for op, n in sorted(self.op_count.items())
+            },
+        }
+        if treap is not None:
+            n = len(treap)
+            height = treap.height()
+            rep["size"] = n
+            rep["height"] = height
+            # A random treap's expected height is ~2.99 log2 n (4.31 ln n);
+            # a ratio well above that means a degenerate tree
+            rep["height_ratio"] = height / math.log2(n + 1) if n else 0.0
+        return rep
+
+    def dump(self, stream, treap=None):
+        json.dump(self.report(treap), stream, indent=2)
+        stream.write("\n")
+
+
+# Treap that counts rotations, split/merge work and access depths and
+# times every public operation. The plain Treap hot path is untouched:
+# instrumentation costs nothing unless this class is used.
+# Treaps produced by split/merge share the same TreapStats.
+class InstrumentedTreap(Treap):
+    def __init__(self, stats=None):
+        super().__init__()
+        self.stats = stats if stats is not None else TreapStats()
+
+    # Nodes visited when looking up key (as counted by search)
+    def _depth_of(self, key):
+        depth = 0
+        cur = self.root
+        while cur is not None:
+            depth += 1
+            if key == cur.key:
+                break
+            cur = cur.left if key < cur.key else cur.right
+        return depth
+
+    # Height of the tree (longest root-to-leaf path, in nodes)
+    def height(self):
+        best = 0
+        stack = [(self.root, 1)] if self.root is not None else []
+        while stack:
+            node, d = stack.pop()
+            if d > best:
+                best = d
+            if node.left is not None:
+                stack.append((node.left, d + 1))
+            if node.right is not None:
+                stack.append((node.right, d + 1))
+        return best
+
+    def _rotate_right(self, y):
+        self.stats.rotations += 1
+        return super()._rotate_right(y)
+
+    def _rotate_left(self, x):
+        self.stats.rotations += 1
+        return super()._rotate_left(x)
+
+    def _split(self, node, key):
+        steps = 0
+        cur = node
+        while cur is not None:
+            steps += 1
+            cur = cur.left if key <= cur.key else cur.right
+        self.stats.split_steps += steps
+        return super()._split(node, key)
+
+    def _merge_nodes(self, left, right):
+        steps = 0
+        a, b = left, right
+        while a is not None and b is not None:
+            steps += 1
+            if a.priority < b.priority:
+                a = a.right
+            else:
+                b = b.left
+        self.stats.merge_steps += steps
+        return super()._merge_nodes(left, right)
+
+    def insert(self, key, priority=None):
+        t0 = time.perf_counter_ns()
+        self.stats.record_depth(self._depth_of(key))
+        super().insert(key, priority)
+        self.stats.record_op("insert", time.perf_counter_ns() - t0)
+
+    def delete(self, key):
+        t0 = time.perf_counter_ns()
+        self.stats.record_depth(self._depth_of(key))
+        super().delete(key)
+        self.stats.record_op("delete", time.perf_counter_ns() - t0)
+
+    def search(self, key):
+        t0 = time.perf_counter_ns()
+        depth = 0
+        found = False
+        cur = self.root
+        while cur is not None:
+            depth += 1
+            if key < cur.key:
+                cur = cur.left
+            elif key > cur.key:
+                cur = cur.right
+            else:
+                found = True
+                break
+        self.stats.record_depth(depth)
+        self.stats.record_op("search", time.perf_counter_ns() - t0)
+        return found
+
+    def split(self, key):
+        t0 = time.perf_counter_ns()
+        L, R = self._split(self.root, key)
+        left_t, right_t = InstrumentedTreap(self.stats), InstrumentedTreap(self.stats)
+        left_t.root, right_t.root = L, R
+        self.stats.record_op("split", time.perf_counter_ns() - t0)
+        return (left_t, right_t)
+
+    @staticmethod
+    def merge(left_treap, right_treap):
+        t0 = time.perf_counter_ns()
+        t = InstrumentedTreap(getattr(left_treap, "stats", None))
+        t.root = t._merge_nodes(left_treap.root, right_treap.root)
+        t.stats.record_op("merge", time.perf_counter_ns() - t0)
+        return t
+
+    # One timed insert_many op per batch; its keys go to bulk_inserts since
+    # the one-pass build has no per-key latency or depth
+    def insert_many(self, keys):
+        t0 = time.perf_counter_ns()
+        keys = list(keys)
+        super().insert_many(keys)
+        self.stats.bulk_inserts += len(keys)
+        self.stats.record_op("insert_many", time.perf_counter_ns() - t0)
+
+    def inorder(self, node=None):
+        t0 = time.perf_counter_ns()
+        res = super().inorder(node)
+        self.stats.record_op("inorder", time.perf_counter_ns() - t0)
+        return res
+
+    # Iteration (how the command driver prints Inorder) goes through the
+    # timed inorder walk
+    def __iter__(self):
+        return iter(self.inorder())
+
+    def report(self):
+        return self.stats.report(self)
@@ -0,0 +1,268 @@
+import heapq
+import os
+import random
+import sys
+import time
+from array import array
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+
+from array_treap import NIL, ArrayTreap
+
+# Below this many keys per chunk, process start-up costs more than it saves
+MIN_CHUNK = 50_000
+# Splitter sample size per chunk; a larger sample evens out chunk sizes
+OVERSAMPLE = 64
+
+
+# Worker: sort and dedupe one slice of the (unsorted) input and cut it at
+# the splitters; returns one sorted byte string per chunk
+def _sort_slice(job):
+    keys_bytes, splitters = job
+    ks = array("q")
+    ks.frombytes(keys_bytes)
+    ks = array("q", sorted(set(ks)))
+    cuts = [0] + [bisect_left(ks, s) for s in splitters] + [len(ks)]
+    return [ks[cuts[i]:cuts[i + 1]].tobytes() for i in range(len(cuts) - 1)]
+
+
+# Worker: the keys lo <= key < hi (None = unbounded) of the treap at
+# `root` in a shipped copy of its pool, in order - the treap split at the
+# chunk's boundaries, without touching the original
+def _treap_range(job):
+    keys_bytes, left_bytes, right_bytes, root, lo, hi = job
+    keys, left, right = array("q"), array("i"), array("i")
+    keys.frombytes(keys_bytes)
+    left.frombytes(left_bytes)
+    right.frombytes(right_bytes)
+    out = array("q")
+    stack = []
+    cur = root
+    while cur >= 0:
+        if lo is not None and keys[cur] < lo:
+            cur = right[cur]
+        else:
+            stack.append(cur)
+            cur = left[cur]
+    while stack:
+        h = stack.pop()
+        k = keys[h]
+        if hi is not None and k >= hi:
+            break
+        out.append(k)
+        cur = right[h]
+        while cur >= 0:
+            stack.append(cur)
+            cur = left[cur]
+    return out.tobytes()
+
+
+# Worker: union of the sorted pieces that make up one chunk
+def _merge_chunk(pieces):
+    if len(pieces) == 1:
+        return pieces[0]
+    ks = array("q")
+    for piece in pieces:
+        ks.frombytes(piece)
+    return array("q", sorted(set(ks))).tobytes()
+
+
+# Worker: random priorities and the Cartesian tree shape (stack build, as
+# in ArrayTreap._build_sorted_nodes) for one chunk of sorted distinct
+# keys. Handles are shifted by `offset` so they are already valid in the
+# final concatenated pool; everything travels back as raw bytes.
+def _build_chunk(job):
+    keys_bytes, offset, seed = job
+    n = len(keys_bytes) // array("q").itemsize
+    rnd = random.Random(seed)
+    prio = array("d", [rnd.random() for _ in range(n)])
+    left = array("i", [NIL]) * n
+    right = array("i", [NIL]) * n
+    stack = []
+    for i in range(n):
+        p = prio[i]
+        last = NIL
+        while stack and prio[stack[-1]] > p:
+            last = stack.pop()
+        if last != NIL:
+            left[i] = last + offset
+        if stack:
+            right[stack[-1]] = i + offset
+        stack.append(i)
+    root = stack[0] + offset if stack else NIL
+    return prio.tobytes(), left.tobytes(), right.tobytes(), root
+
+
+# m keys of a treap with the smallest priorities (best-first from the
+# root): a uniform random sample of its keys, found in O(m log m)
+def _top_keys(t, m):
+    keys, prio, left, right = t.pool.key, t.pool.priority, t.pool.left, t.pool.right
+    heap = [(prio[t.root], t.root)] if t.root != NIL else []
+    out = []
+    while heap and len(out) < m:
+        _, h = heapq.heappop(heap)
+        out.append(keys[h])
+        for c in (left[h], right[h]):
+            if c != NIL:
+                heapq.heappush(heap, (prio[c], c))
+    return out
+
+
+# Chunk boundaries: quantiles of a sample drawn from every source in
+# proportion to its size
+def _splitters(lists, treaps, parts, total):
+    rate = OVERSAMPLE * parts / total
+    sample = []
+    for keys in lists:
+        sample += random.sample(keys, min(len(keys), int(len(keys) * rate) + 1))
+    for t in treaps:
+        sample += _top_keys(t, int(len(t.pool) * rate) + 1)
+    sample.sort()
+    return sorted(set(sample[len(sample) * i // parts] for i in range(1, parts)))
+
+
+# Sample sort into an ArrayTreap. The parent only samples splitters,
+# copies key slices and pools into bytes and concatenates the results;
+# the workers do all of the per-key work in three rounds:
+#   1. sort and dedupe each input slice and cut it at the splitters;
+#      cut each treap at the chunk boundaries with a bounded walk
+#   2. union the pieces of each chunk
+#   3. build each chunk's tree at its final offset in the pool
+# The chunk trees have ordered, disjoint key ranges and are joined with
+# ArrayTreap.merge.
+def _parallel_treap(sources, workers, executor):
+    workers = workers or os.cpu_count() or 1
+    lists = [s for s in sources if not isinstance(s, ArrayTreap)]
+    treaps = [s for s in sources if isinstance(s, ArrayTreap) and s.root != NIL]
+    total = sum(map(len, lists)) + sum(len(t.pool) for t in treaps)
+    parts = max(1, min(workers, total // MIN_CHUNK))
+
+    if parts == 1:
+        ks = set()
+        for s in lists + treaps:
+            ks.update(s)
+        chunks = [array("q", sorted(ks)).tobytes()]
+        results = [_build_chunk((chunks[0], 0, random.getrandbits(64)))]
+    else:
+        splitters = _splitters(lists, treaps, parts, total)
+        n_chunks = len(splitters) + 1
+        bounds = [None] + splitters + [None]
+        slice_jobs = []
+        for keys in lists:
+            n = len(keys)
+            for i in range(parts):
+                part = keys[n * i // parts:n * (i + 1) // parts]
+                if part:
+                    slice_jobs.append((array("q", part).tobytes(), splitters))
+        range_jobs = []
+        for t in treaps:
+            pool_bytes = (t.pool.key.tobytes(), t.pool.left.tobytes(), t.pool.right.tobytes())
+            range_jobs += [pool_bytes + (t.root, bounds[j], bounds[j + 1]) for j in range(n_chunks)]
+
+        ctx = nullcontext(executor) if executor is not None else ProcessPoolExecutor(parts)
+        with ctx as ex:
+            pieces = [[] for _ in range(n_chunks)]
+            for cut in ex.map(_sort_slice, slice_jobs):
+                for j, piece in enumerate(cut):
+                    pieces[j].append(piece)
+            for i, piece in enumerate(ex.map(_treap_range, range_jobs)):
+                pieces[i % n_chunks].append(piece)
+            chunks = list(ex.map(_merge_chunk, pieces))
+            jobs = []
+            offset = 0
+            for chunk in chunks:
+                jobs.append((chunk, offset, random.getrandbits(64)))
+                offset += len(chunk) // array("q").itemsize
+            results = list(ex.map(_build_chunk, jobs))
+
+    t = ArrayTreap()
+    pool = t.pool
+    roots = []
+    for chunk, (prio, left, right, root) in zip(chunks, results):
+        pool.key.frombytes(chunk)
+        pool.priority.frombytes(prio)
+        pool.left.frombytes(left)
+        pool.right.frombytes(right)
+        if root != NIL:
+            roots.append(root)
+    t.root = roots[0] if roots else NIL
+    for root in roots[1:]:
+        chunk = ArrayTreap(pool)
+        chunk.root = root
+        t = ArrayTreap.merge(t, chunk)
+    return t
+
+
+# Build an ArrayTreap from any keys using a process pool. Node-object
+# Treaps cannot cross process boundaries without re-creating every node
+# in the parent, so the parallel path targets the array backend.
+def parallel_build(keys, workers=None, executor=None):
+    return _parallel_treap([keys if isinstance(keys, list) else list(keys)], workers, executor)
+
+
+# Union of two (possibly overlapping) key sets as a new ArrayTreap. An
+# ArrayTreap input is cut at the chunk boundaries inside the workers
+# and is left unchanged; any other input is treated as an iterable of
+# keys and sorted in slices like parallel_build.
+def parallel_union(a, b, workers=None, executor=None):
+    sources = [s if isinstance(s, (ArrayTreap, list)) else list(s) for s in (a, b)]
+    return _parallel_treap(sources, workers, executor)
+
+
+# Runs map in the calling process and adds up the time spent in the
+# worker functions, so the parent's serial share can be measured
+class _InlineExecutor:
+    def __init__(self):
+        self.worker_time = 0.0
+
+    def map(self, fn, jobs):
+        out = []
+        for job in jobs:
+            t0 = time.perf_counter()
+            out.append(fn(job))
+            self.worker_time += time.perf_counter() - t0
+        return out
+
+
+# Benchmark: serial ArrayTreap.from_sorted vs parallel_build for 1, 2, 4,
+# ... workers up to the core count, and the share of parallel_build /
+# parallel_union spent in the parent, which bounds the speedup (Amdahl)
+#   python3 parallel_treap.py [n_keys] [chunks]
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    chunks = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    keys = random.sample(range(10 * n), n)
+    cores = os.cpu_count() or 1
+
+    t0 = time.perf_counter()
+    ArrayTreap.from_sorted(sorted(keys))
+    serial = time.perf_counter() - t0
+    print(f"serial from_sorted  {serial:7.2f}s")
+
+    w = 1
+    while True:
+        with ProcessPoolExecutor(w) as ex:
+            t0 = time.perf_counter()
+            parallel_build(keys, w, ex)
+            elapsed = time.perf_counter() - t0
+        print(f"parallel x{w:<3}       {elapsed:7.2f}s  speedup {serial / elapsed:5.2f}")
+        if w >= cores:
+            break
+        w = min(2 * w, cores)
+
+    other = ArrayTreap.from_sorted(sorted(random.sample(range(10 * n), n)))
+    for name, run in (("build", lambda ex: parallel_build(keys, chunks, ex)),
+                      ("union", lambda ex: parallel_union(other, keys, chunks, ex))):
+        ex = _InlineExecutor()
+        t0 = time.perf_counter()
+        run(ex)
+        elapsed = time.perf_counter() - t0
+        s = (elapsed - ex.worker_time) / elapsed
+        bound = 1 / (s + (1 - s) / chunks)
+        print(f"{name} in {chunks} chunks: parent share {s:6.1%}, "
+              f"speedup bound at {chunks} workers {bound:5.2f}")
+
+
+if __name__ == "__main__":
+    main()
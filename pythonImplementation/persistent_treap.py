@@ -0,0 +1,236 @@
+from treap import Node, Treap, _size
+
+
+# Fresh copy of a node (same key, priority, children and size)
+def _copy(node):
+    c = Node(node.key, node.priority)
+    c.left = node.left
+    c.right = node.right
+    c.size = node.size
+    return c
+
+
+# Persistent treap: nodes are never modified once they are reachable,
+# every update copies only the O(log n) nodes on its path and shares the
+# rest. A version is just a root, so snapshot() and restore() are O(1)
+# and old versions stay readable while the treap keeps changing.
+# Read-only Treap methods (search, rank, select, irange, ...) are
+# inherited unchanged.
+class PersistentTreap(Treap):
+    def __init__(self):
+        super().__init__()
+        self._versions = []
+
+    # Record the current version; returns its id for restore()
+    def snapshot(self):
+        self._versions.append(self.root)
+        return len(self._versions) - 1
+
+    # Make a recorded version current again (later snapshots stay valid)
+    def restore(self, version):
+        self.root = self._versions[version]
+
+    # Read-only view of a recorded version, sharing all of its nodes
+    def at(self, version):
+        t = PersistentTreap()
+        t.root = self._versions[version]
+        return t
+
+    def _contains(self, node, key):
+        while node is not None:
+            if key < node.key:
+                node = node.left
+            elif key > node.key:
+                node = node.right
+            else:
+                return True
+        return False
+
+    # Copy the nodes on the search path that keep priority over the new
+    # node, then split the remaining subtree (copying) under the new node
+    def _insert(self, node, key, priority=None, new=None):
+        if self._contains(node, key):
+            return node
+        if new is None:
+            new = Node(key, priority)
+        root = parent = None
+        went_left = False
+        cur = node
+        while cur is not None and cur.priority <= new.priority:
+            c = _copy(cur)
+            c.size += 1
+            if parent is None:
+                root = c
+            elif went_left:
+                parent.left = c
+            else:
+                parent.right = c
+            parent = c
+            went_left = key < c.key
+            cur = c.left if went_left else c.right
+
+        new.left, new.right = self._split(cur, key)
+        new.size = 1 + _size(new.left) + _size(new.right)
+        if parent is None:
+            return new
+        if went_left:
+            parent.left = new
+        else:
+            parent.right = new
+        return root
+
+    # Copy the path down to the key and replace its node by the
+    # (copying) merge of its children
+    def _delete(self, node, key):
+        if not self._contains(node, key):
+            return node
+        root = parent = None
+        went_left = False
+        cur = node
+        while cur.key != key:
+            c = _copy(cur)
+            c.size -= 1
+            if parent is None:
+                root = c
+            elif went_left:
+                parent.left = c
+            else:
+                parent.right = c
+            parent = c
+            went_left = key < c.key
+            cur = c.left if went_left else c.right
+
+        sub = self._merge_nodes(cur.left, cur.right)
+        if parent is None:
+            return sub
+        if went_left:
+            parent.left = sub
+        else:
+            parent.right = sub
+        return root
+
+    # Same top-down split as Treap._split, but every visited node is
+    # copied before it is relinked
+    def _split(self, node, key):
+        left_root = right_root = None
+        left_tail = right_tail = None
+        path = []
+        while node is not None:
+            c = _copy(node)
+            path.append(c)
+            if key <= c.key:
+                if right_tail is None:
+                    right_root = c
+                else:
+                    right_tail.left = c
+                right_tail = c
+                node = c.left
+            else:
+                if left_tail is None:
+                    left_root = c
+                else:
+                    left_tail.right = c
+                left_tail = c
+                node = c.right
+        if left_tail is not None:
+            left_tail.right = None
+        if right_tail is not None:
+            right_tail.left = None
+        for n in reversed(path):
+            n.size = 1 + _size(n.left) + _size(n.right)
+        return (left_root, right_root)
+
+    def split(self, key):
+        L, R = self._split(self.root, key)
+        left_t, right_t = PersistentTreap(), PersistentTreap()
+        left_t.root, right_t.root = L, R
+        return (left_t, right_t)
+
+    # Same top-down merge as Treap._merge_nodes, copying hooked nodes
+    def _merge_nodes(self, left, right):
+        if left is None or right is None:
+            return left or right
+        root = parent = None
+        hook_right = False
+        left_size, right_size = left.size, right.size
+        while left is not None and right is not None:
+            if left.priority < right.priority:
+                nxt = _copy(left)
+                nxt.size = left_size + right_size
+                left = nxt.right
+                left_size = _size(left)
+                next_hook_right = True
+            else:
+                nxt = _copy(right)
+                nxt.size = left_size + right_size
+                right = nxt.left
+                right_size = _size(right)
+                next_hook_right = False
+            if parent is None:
+                root = nxt
+            elif hook_right:
+                parent.right = nxt
+            else:
+                parent.left = nxt
+            parent, hook_right = nxt, next_hook_right
+        rest = left if left is not None else right
+        if hook_right:
+            parent.right = rest
+        else:
+            parent.left = rest
+        return root
+
+    # Both inputs stay valid: the result shares their untouched nodes
+    @staticmethod
+    def merge(left_treap: "Treap", right_treap: "Treap") -> "PersistentTreap":
+        t = PersistentTreap()
+        t.root = t._merge_nodes(left_treap.root, right_treap.root)
+        return t
+
+    # Batches go through persistent inserts so existing versions keep
+    # their nodes (the in-place one-pass rebuild would relink them)
+    def insert_many(self, keys):
+        for key in sorted(set(keys)):
+            self.root = self._insert(self.root, key)
+
+    # Set algebra reuses Treap._set_op: split/merge/insert already copy,
+    # _own hands out copies of roots it relinks and _pop_min_if copies the
+    # spine it detaches from, so both inputs and every version stay intact
+    def _own(self, node):
+        return _copy(node)
+
+    def _pop_min_if(self, node, key):
+        cur = node
+        while cur is not None and cur.left is not None:
+            cur = cur.left
+        if cur is None or cur.key != key:
+            return (node, None)
+        if cur is node:
+            return (node.right, node)
+        root = parent = _copy(node)
+        root.size -= 1
+        while parent.left is not cur:
+            child = _copy(parent.left)
+            child.size -= 1
+            parent.left = child
+            parent = child
+        parent.left = cur.right
+        return (root, cur)
+
+    @staticmethod
+    def union(left_treap: "Treap", right_treap: "Treap") -> "PersistentTreap":
+        t = PersistentTreap()
+        t.root = t._set_op(left_treap.root, right_treap.root, Treap._UNION)
+        return t
+
+    @staticmethod
+    def intersection(left_treap: "Treap", right_treap: "Treap") -> "PersistentTreap":
+        t = PersistentTreap()
+        t.root = t._set_op(left_treap.root, right_treap.root, Treap._INTERSECTION)
+        return t
+
+    @staticmethod
+    def difference(left_treap: "Treap", right_treap: "Treap") -> "PersistentTreap":
+        t = PersistentTreap()
+        t.root = t._set_op(left_treap.root, right_treap.root, Treap._DIFFERENCE)
+        return t
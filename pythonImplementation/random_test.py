@@ -1,6 +1,15 @@
+import io
 import unittest
 import random
-from treap import Treap
+from treap import Treap, run_treap_ops, parse_ops, INSERT, SEARCH, INORDER
+from array_treap import ArrayTreap, NIL
+from augmented_treap import AugmentedTreap
+from persistent_treap import PersistentTreap
+from implicit_treap import ImplicitTreap
+from instrumented_treap import InstrumentedTreap, TreapStats
+from sharded_treap import ShardedTreap
+import parallel_treap
+from parallel_treap import parallel_build, parallel_union
 
 
 class TestTreap(unittest.TestCase):
@@ -59,6 +68,500 @@ class TestTreap(unittest.TestCase):
         merged_t = self.t.merge(left_t, right_t)
         self.assertEqual(merged_t.inorder(), remaining)
 
+    def test_degenerate_chain_no_recursion(self):
+        """Sorted priorities build a depth-n chain; every op must still work."""
+        n = 5000
+        t = Treap()
+        for x in range(n):
+            t.insert(x, priority=x)
+        self.assertEqual(t.inorder(), list(range(n)))
+        left_t, right_t = t.split(n // 2)
+        self.assertEqual(left_t.inorder(), list(range(n // 2)))
+        merged_t = Treap.merge(left_t, right_t)
+        for x in range(0, n, 2):
+            merged_t.delete(x)
+        self.assertEqual(merged_t.inorder(), list(range(1, n, 2)))
+        self.assertTrue(merged_t.search(n - 1))
+        self.assertFalse(merged_t.search(0))
+
+    def test_from_sorted(self):
+        t = Treap.from_sorted([1, 2, 2, 5, 8, 13])
+        self.assertEqual(t.inorder(), [1, 2, 5, 8, 13])
+        self.assertTrue(self._check_heap(t.root))
+        with self.assertRaises(ValueError):
+            Treap.from_sorted([3, 1])
+
+    def test_insert_many(self):
+        batch = random.sample(range(4000, 8000), 500) + self.data[:10]
+        self.t.insert_many(batch)
+        self.assertEqual(self.t.inorder(), sorted(set(self.data) | set(batch)))
+        self.assertTrue(self._check_heap(self.t.root))
+        empty = Treap()
+        empty.insert_many([])
+        self.assertIsNone(empty.root)
+
+    def test_set_algebra(self):
+        other = random.sample(range(2500, 7500), 800)
+        ops = [
+            (Treap.union, set.union),
+            (Treap.intersection, set.intersection),
+            (Treap.difference, set.difference),
+        ]
+        for treap_op, set_op in ops:
+            a, b = Treap(), Treap()
+            for x in self.data:
+                a.insert(x)
+            for x in other:
+                b.insert(x)
+            res = treap_op(a, b)
+            self.assertEqual(res.inorder(), sorted(set_op(set(self.data), set(other))))
+            self.assertTrue(self._check_heap(res.root))
+
+    def test_union_small_delta(self):
+        delta = Treap()
+        for x in (-1, 3, self.data[0], 99999):
+            delta.insert(x)
+        res = Treap.union(self.t, delta)
+        self.assertEqual(res.inorder(), sorted(set(self.data) | {-1, 3, 99999}))
+        self.assertEqual(Treap.union(Treap(), Treap()).inorder(), [])
+
+    def test_iter_and_irange(self):
+        keys = sorted(self.data)
+        self.assertEqual(list(self.t), keys)
+        lo, hi = 1200, 3700
+        expected = [x for x in keys if lo <= x <= hi]
+        self.assertEqual(list(self.t.irange(lo, hi)), expected)
+        self.assertEqual(list(self.t.irange(lo, hi, reverse=True)), expected[::-1])
+        self.assertEqual(list(self.t.irange(hi=lo)), [x for x in keys if x <= lo])
+        self.assertEqual(list(self.t.irange(lo=hi, reverse=True)), [x for x in keys if x >= hi][::-1])
+        self.assertEqual(list(self.t.irange(10, 5)), [])
+        self.assertEqual(list(self.t.islice(5, 15)), keys[5:15])
+        self.assertEqual(list(self.t.islice(0, 3, reverse=True)), keys[::-1][:3])
+
+    def _check_sizes(self, node):
+        if node is None:
+            return 0
+        size = 1 + self._check_sizes(node.left) + self._check_sizes(node.right)
+        self.assertEqual(node.size, size)
+        return size
+
+    def test_order_statistics(self):
+        to_delete = random.sample(self.data, 100)
+        for x in to_delete:
+            self.t.delete(x)
+        keys = sorted(set(self.data) - set(to_delete))
+        self._check_sizes(self.t.root)
+        self.assertEqual(len(self.t), len(keys))
+        for i in random.sample(range(len(keys)), 50):
+            self.assertEqual(self.t.select(i), keys[i])
+            self.assertEqual(self.t.rank(keys[i]), i)
+        self.assertEqual(self.t.rank(-1), 0)
+        self.assertEqual(self.t.rank(10 ** 9), len(keys))
+        self.assertEqual(self.t.count_range(1000, 2000),
+                         sum(1 for x in keys if 1000 <= x <= 2000))
+        self.assertEqual(self.t.count_range(5, 4), 0)
+        with self.assertRaises(IndexError):
+            self.t.select(len(keys))
+
+    def test_sizes_after_bulk_and_set_ops(self):
+        left_t, right_t = self.t.split(2500)
+        self._check_sizes(left_t.root)
+        self._check_sizes(right_t.root)
+        merged_t = Treap.merge(left_t, right_t)
+        self._check_sizes(merged_t.root)
+        merged_t.insert_many(range(4000, 6000, 3))
+        self._check_sizes(merged_t.root)
+        other = Treap.from_sorted(range(0, 6000, 7))
+        self._check_sizes(other.root)
+        res = Treap.difference(merged_t, other)
+        self._check_sizes(res.root)
+        self.assertEqual(len(res), len(res.inorder()))
+
+    def test_parse_ops_counts_lines(self):
+        # Unknown commands (with their arguments) and blank lines each use
+        # up exactly one of the counted lines, as in the line-based driver
+        lines = [b"Basic", b"3", b"Foo 5", b"", b"Insert 3", b"Insert 4"]
+        codes, keys, pos = parse_ops(lines, 2, 3)
+        self.assertEqual(list(zip(codes, keys)), [(INSERT, 3)])
+        self.assertEqual(pos, 5)
+        codes, keys, pos = parse_ops(["Bar 1 2", "Search 9", "Inorder"])
+        self.assertEqual(list(zip(codes, keys)), [(SEARCH, 9), (INORDER, 0)])
+
+    def test_run_treap_ops_output(self):
+        out = io.StringIO()
+        run_treap_ops(["Insert 10", "Insert 5", "Search 7", "Inorder",
+                       "Delete 10", "Search 5", "Delete 5", "Inorder"], out=out)
+        self.assertEqual(out.getvalue(), "Search 7: Not Found\nInorder: [5, 10]\n"
+                                         "Search 5: Found\nInorder: []\n")
+
+
+class TestArrayTreap(unittest.TestCase):
+    def _check_heap(self, t):
+        prio, left, right = t.pool.priority, t.pool.left, t.pool.right
+        stack = [t.root] if t.root != NIL else []
+        while stack:
+            h = stack.pop()
+            for ch in (left[h], right[h]):
+                if ch != NIL:
+                    if prio[ch] < prio[h]:
+                        return False
+                    stack.append(ch)
+        return True
+
+    def setUp(self):
+        self.data = random.sample(range(5000), 1000)
+        self.t = ArrayTreap()
+        for x in self.data:
+            self.t.insert(x)
+
+    def test_inorder_search_delete(self):
+        self.assertEqual(self.t.inorder(), sorted(self.data))
+        self.assertTrue(self._check_heap(self.t))
+        to_delete = random.sample(self.data, 100)
+        for x in to_delete:
+            self.t.delete(x)
+        remaining = sorted(set(self.data) - set(to_delete))
+        self.assertEqual(self.t.inorder(), remaining)
+        self.assertTrue(self._check_heap(self.t))
+        for x in to_delete:
+            self.assertFalse(self.t.search(x))
+        for x in remaining[:50]:
+            self.assertTrue(self.t.search(x))
+
+    def test_free_list_reuses_slots(self):
+        """Deleted slots are handed back out before the pool grows."""
+        for x in self.data[:200]:
+            self.t.delete(x)
+        for x in range(10000, 10200):
+            self.t.insert(x)
+        self.assertEqual(len(self.t.pool), 1000)
+        self.assertEqual(self.t.inorder(), sorted(self.data[200:] + list(range(10000, 10200))))
+
+    def test_split_merge(self):
+        k = random.choice(self.data)
+        left_t, right_t = self.t.split(k)
+        self.assertTrue(all(x < k for x in left_t.inorder()))
+        self.assertTrue(all(x >= k for x in right_t.inorder()))
+        merged_t = ArrayTreap.merge(left_t, right_t)
+        self.assertEqual(merged_t.inorder(), sorted(self.data))
+
+    def test_merge_across_pools(self):
+        a, b = ArrayTreap(), ArrayTreap()
+        for x in range(100):
+            a.insert(x)
+        for x in range(100, 200):
+            b.insert(x)
+        merged_t = ArrayTreap.merge(a, b)
+        self.assertEqual(merged_t.inorder(), list(range(200)))
+        self.assertTrue(self._check_heap(merged_t))
+
+    def test_from_sorted_insert_many(self):
+        t = ArrayTreap.from_sorted(range(0, 100, 2))
+        t.insert_many(range(1, 100, 2))
+        t.insert_many([0, 99])
+        self.assertEqual(t.inorder(), list(range(100)))
+        self.assertTrue(self._check_heap(t))
+
+    def test_irange(self):
+        keys = sorted(self.data)
+        self.assertEqual(list(self.t), keys)
+        expected = [x for x in keys if 700 <= x <= 2100]
+        self.assertEqual(list(self.t.irange(700, 2100)), expected)
+        self.assertEqual(list(self.t.irange(700, 2100, reverse=True)), expected[::-1])
+        self.assertEqual(list(self.t.islice(3, 9)), keys[3:9])
+
+    def test_run_treap_ops_backend(self):
+        lines = ["Insert 5", "Insert 3", "Insert 9", "Delete 3"]
+        t = run_treap_ops(lines, treap_cls=ArrayTreap)
+        self.assertIsInstance(t, ArrayTreap)
+        self.assertEqual(t.inorder(), [5, 9])
+
+
+class TestAugmentedTreap(unittest.TestCase):
+    def setUp(self):
+        self.values = {k: random.randint(-1000, 1000) for k in random.sample(range(5000), 800)}
+        self.sum_t = AugmentedTreap(lambda a, b: a + b, 0)
+        self.max_t = AugmentedTreap(max, float("-inf"))
+        for k, v in self.values.items():
+            self.sum_t.insert(k, v)
+            self.max_t.insert(k, v)
+
+    def _brute(self, lo, hi):
+        return [v for k, v in sorted(self.values.items()) if lo <= k <= hi]
+
+    def test_aggregate_matches_brute_force(self):
+        for _ in range(200):
+            lo, hi = sorted(random.sample(range(-10, 5010), 2))
+            vals = self._brute(lo, hi)
+            self.assertEqual(self.sum_t.aggregate(lo, hi), sum(vals))
+            self.assertEqual(self.max_t.aggregate(lo, hi), max(vals, default=float("-inf")))
+        self.assertEqual(self.sum_t.total(), sum(self.values.values()))
+
+    def test_updates_deletes_split_merge(self):
+        for k in random.sample(list(self.values), 200):
+            self.sum_t.delete(k)
+            del self.values[k]
+        for k in random.sample(list(self.values), 100):
+            self.values[k] = random.randint(-1000, 1000)
+            self.sum_t.insert(k, self.values[k])
+        self.assertEqual(self.sum_t.inorder(), sorted(self.values))
+        self.assertEqual(self.sum_t.aggregate(1000, 4000), sum(self._brute(1000, 4000)))
+        left_t, right_t = self.sum_t.split(2500)
+        self.assertEqual(left_t.total(), sum(self._brute(-1, 2499)))
+        self.assertEqual(right_t.total(), sum(self._brute(2500, 5000)))
+        merged_t = AugmentedTreap.merge(left_t, right_t)
+        self.assertEqual(merged_t.aggregate(0, 5000), sum(self.values.values()))
+
+    def test_non_commutative_combine(self):
+        """Values are combined in key order, so list concatenation works."""
+        t = AugmentedTreap(lambda a, b: a + b, ())
+        keys = random.sample(range(1000), 300)
+        for k in keys:
+            t.insert(k, (k,))
+        ordered = sorted(keys)
+        self.assertEqual(t.total(), tuple(ordered))
+        self.assertEqual(t.aggregate(200, 700), tuple(k for k in ordered if 200 <= k <= 700))
+        self.assertEqual(t.aggregate(5000, 6000), ())
+
+
+class TestPersistentTreap(unittest.TestCase):
+    @staticmethod
+    def _node_ids(node):
+        ids, stack = set(), [node] if node else []
+        while stack:
+            n = stack.pop()
+            ids.add(id(n))
+            stack.extend(c for c in (n.left, n.right) if c is not None)
+        return ids
+
+    def setUp(self):
+        self.data = random.sample(range(5000), 1000)
+        self.t = PersistentTreap()
+        for x in self.data:
+            self.t.insert(x)
+
+    def test_snapshots_survive_updates(self):
+        v0 = self.t.snapshot()
+        to_delete = random.sample(self.data, 300)
+        for x in to_delete:
+            self.t.delete(x)
+        added = random.sample(range(5000, 9000), 300)
+        for x in added:
+            self.t.insert(x)
+        v1 = self.t.snapshot()
+        current = sorted((set(self.data) - set(to_delete)) | set(added))
+        self.assertEqual(self.t.at(v0).inorder(), sorted(self.data))
+        self.assertEqual(self.t.inorder(), current)
+        self.assertEqual(len(self.t.at(v0)), 1000)
+        self.t.restore(v0)
+        self.assertEqual(self.t.inorder(), sorted(self.data))
+        self.assertEqual(self.t.select(10), sorted(self.data)[10])
+        self.t.restore(v1)
+        self.assertEqual(self.t.inorder(), current)
+
+    def test_split_merge_keep_inputs(self):
+        before = self.t.inorder()
+        k = random.choice(self.data)
+        left_t, right_t = self.t.split(k)
+        self.assertEqual(self.t.inorder(), before)
+        self.assertTrue(all(x < k for x in left_t.inorder()))
+        merged_t = PersistentTreap.merge(left_t, right_t)
+        self.assertEqual(merged_t.inorder(), before)
+        self.assertEqual(left_t.inorder(), [x for x in before if x < k])
+        self.assertEqual(len(merged_t), len(before))
+
+    def test_update_copies_only_path(self):
+        old_ids = self._node_ids(self.t.root)
+        self.t.snapshot()
+        self.t.insert(10 ** 6)
+        self.t.delete(self.data[0])
+        new_nodes = self._node_ids(self.t.root) - old_ids
+        self.assertLess(len(new_nodes), 150)
+
+    def test_set_algebra_keeps_inputs(self):
+        other_data = random.sample(range(2500, 7500), 1000)
+        other = PersistentTreap()
+        for x in other_data:
+            other.insert(x)
+        v0, w0 = self.t.snapshot(), other.snapshot()
+        a, b = sorted(self.data), sorted(other_data)
+        sa, sb = set(a), set(b)
+        ops = [(PersistentTreap.union, sa | sb),
+               (PersistentTreap.intersection, sa & sb),
+               (PersistentTreap.difference, sa - sb)]
+        for op, expected in ops:
+            out = op(self.t, other)
+            self.assertIsInstance(out, PersistentTreap)
+            self.assertEqual(out.inorder(), sorted(expected))
+            self.assertEqual(len(out), len(expected))
+            self.assertEqual(self.t.inorder(), a)
+            self.assertEqual(other.inorder(), b)
+            self.assertEqual(self.t.at(v0).inorder(), a)
+            self.assertEqual(other.at(w0).inorder(), b)
+            self.assertEqual(len(self.t), 1000)
+            self.assertEqual(len(other), 1000)
+        # Leaf fast path of union must not relink an input leaf
+        single = PersistentTreap()
+        single.insert(-1)
+        out = PersistentTreap.union(self.t, single)
+        self.assertEqual(out.inorder(), [-1] + a)
+        self.assertEqual(single.inorder(), [-1])
+        self.assertEqual(self.t.inorder(), a)
+
+
+class TestImplicitTreap(unittest.TestCase):
+    def test_random_ops_match_list(self):
+        ref = [random.randint(-50, 50) for _ in range(500)]
+        seq = ImplicitTreap(ref)
+        for _ in range(2000):
+            lo, hi = sorted(random.sample(range(len(ref) + 1), 2))
+            op = random.randrange(6)
+            if op == 0:
+                ref[lo:hi] = ref[lo:hi][::-1]
+                seq.reverse(lo, hi)
+            elif op == 1:
+                d = random.randint(-10, 10)
+                ref[lo:hi] = [x + d for x in ref[lo:hi]]
+                seq.add(lo, hi, d)
+            elif op == 2:
+                self.assertEqual(seq.sum(lo, hi), sum(ref[lo:hi]))
+            elif op == 3:
+                # Cut a slice and paste it elsewhere
+                piece = seq.cut(lo, hi)
+                moved = ref[lo:hi]
+                del ref[lo:hi]
+                at = random.randint(0, len(ref))
+                ref[at:at] = moved
+                seq.paste(at, piece)
+            elif op == 4:
+                at = random.randint(0, len(ref))
+                v = random.randint(-50, 50)
+                ref.insert(at, v)
+                seq.insert(at, v)
+            elif ref:
+                at = random.randrange(len(ref))
+                self.assertEqual(seq.pop(at), ref.pop(at))
+        self.assertEqual(seq.to_list(), ref)
+        self.assertEqual(len(seq), len(ref))
+        self.assertEqual([seq[i] for i in range(0, len(ref), 7)], ref[::7])
+        self.assertEqual(seq[-1], ref[-1])
+
+    def test_empty_and_clamped_ranges(self):
+        seq = ImplicitTreap()
+        self.assertEqual(seq.sum(0, 10), 0)
+        seq.append(4)
+        seq.append(6)
+        seq.reverse(-5, 50)
+        self.assertEqual(seq.to_list(), [6, 4])
+        with self.assertRaises(IndexError):
+            seq[2]
+
+
+class TestInstrumentedTreap(unittest.TestCase):
+    def test_counters_and_report(self):
+        t = InstrumentedTreap()
+        data = random.sample(range(5000), 1000)
+        for x in data:
+            t.insert(x)
+        for x in data[:100]:
+            self.assertTrue(t.search(x))
+        left_t, right_t = t.split(2500)
+        merged_t = InstrumentedTreap.merge(left_t, right_t)
+        merged_t.delete(data[0])
+        rep = merged_t.report()
+        self.assertGreater(rep["rotations"], 0)
+        self.assertGreater(rep["split_steps"], 0)
+        self.assertGreater(rep["merge_steps"], 0)
+        self.assertEqual(rep["ops"]["insert"]["count"], 1000)
+        self.assertEqual(rep["ops"]["search"]["count"], 100)
+        self.assertEqual(sum(rep["depth_histogram"].values()), 1101)
+        self.assertEqual(rep["size"], 999)
+        self.assertEqual(merged_t.inorder(), sorted(data[1:]))
+
+    def test_driver_counts_bulk_load_and_inorder(self):
+        stats = TreapStats()
+        lines = ["Insert %d" % x for x in range(50)] + ["Inorder", "Insert 99", "Search 3"]
+        t = run_treap_ops(lines, treap_cls=lambda: InstrumentedTreap(stats), out=io.StringIO())
+        rep = stats.report(t)
+        self.assertEqual(rep["bulk_inserts"], 50)
+        self.assertEqual(rep["ops"]["insert_many"]["count"], 1)
+        self.assertEqual(rep["ops"]["inorder"]["count"], 1)
+        self.assertEqual(rep["ops"]["insert"]["count"], 1)
+        self.assertEqual(rep["ops"]["search"]["count"], 1)
+
+    def test_degenerate_tree_shows_in_height_ratio(self):
+        t = InstrumentedTreap()
+        for x in range(500):
+            t.insert(x, priority=x)
+        rep = t.report()
+        self.assertEqual(rep["height"], 500)
+        self.assertGreater(rep["height_ratio"], 50)
+
+
+class TestShardedTreap(unittest.TestCase):
+    def test_batches_stitching_and_rebalance(self):
+        lines = []
+        ref = set()
+        expected = []
+        for _ in range(3000):
+            key = random.randrange(1000)
+            cmd = random.choice(["Insert", "Insert", "Delete", "Search"])
+            lines.append(f"{cmd} {key}")
+            if cmd == "Insert":
+                ref.add(key)
+            elif cmd == "Delete":
+                ref.discard(key)
+            else:
+                expected.append(key in ref)
+        codes, keys, _ = parse_ops(lines)
+        with ShardedTreap.for_range(0, 1000, 3) as st:
+            self.assertEqual(st.execute(codes, keys), expected)
+            self.assertEqual(st.inorder(), sorted(ref))
+            self.assertEqual(len(st), len(ref))
+            left_t, right_t = st.split(500)
+            self.assertEqual(left_t.inorder(), [k for k in sorted(ref) if k < 500])
+            self.assertEqual(right_t.inorder(), [k for k in sorted(ref) if k >= 500])
+            self.assertEqual(list(st.irange(100, 700)), [k for k in sorted(ref) if 100 <= k <= 700])
+
+            st.rebalance()  # reset load counters
+            hot = [k for k in sorted(ref) if k < 333]
+            st.execute([SEARCH] * len(hot) * 5, hot * 5)  # search-only load on shard 0
+            old = list(st.boundaries)
+            self.assertTrue(st.rebalance())
+            self.assertLess(st.boundaries[0], old[0])
+            self.assertEqual(st.inorder(), sorted(ref))
+            st.merge([5000, 5001])
+            self.assertTrue(st.search(5001))
+
+
+class TestParallelBuild(unittest.TestCase):
+    def test_build_and_union_match_sets(self):
+        old = parallel_treap.MIN_CHUNK
+        parallel_treap.MIN_CHUNK = 100  # force several chunks on small inputs
+        try:
+            keys = [random.randrange(100000) for _ in range(5000)]
+            t = parallel_build(keys, 4)
+            self.assertEqual(t.inorder(), sorted(set(keys)))
+            a = random.sample(range(20000), 3000)
+            b = random.sample(range(20000), 3000)
+            u = parallel_union(parallel_build(a, 2), b, 3)
+            self.assertEqual(u.inorder(), sorted(set(a) | set(b)))
+            u.insert(-1)
+            u.delete(a[0])
+            self.assertTrue(u.search(-1))
+            self.assertFalse(u.search(a[0]))
+            self.assertEqual(parallel_build([], 2).inorder(), [])
+            # Treap inputs are cut at the chunk boundaries and left intact
+            ta, tb = parallel_build(a, 2), parallel_build(b, 2)
+            u = parallel_union(ta, tb, 4)
+            self.assertEqual(u.inorder(), sorted(set(a) | set(b)))
+            self.assertEqual(ta.inorder(), sorted(a))
+            self.assertEqual(tb.inorder(), sorted(b))
+            dup = [random.randrange(50) for _ in range(2000)]
+            self.assertEqual(parallel_build(dup, 4).inorder(), sorted(set(dup)))
+        finally:
+            parallel_treap.MIN_CHUNK = old
+
 
 if __name__ == "__main__":
     unittest.main(argv=[''], exit=False)
\ No newline at end of file
@@ -1,53 +1,249 @@
+"""In-process benchmark suite for the treap backends.
+
+Times insert, delete, search, split, merge and inorder separately for a
+grid of sizes and key distributions, reporting ops/sec, p50/p99 latency
+and peak traced memory, and saves everything as JSON so runs from
+different commits can be compared:
+
+    python3 runtime_test.py --sizes 1000 100000 --output new.json
+    python3 runtime_test.py --sizes 1000 100000 --compare old.json
+
+Every operation is timed individually with perf_counter_ns; ops/sec is
+the number of operations divided by the sum of their latencies. Memory
+is measured in a separate tracemalloc pass (tracing slows code down, so
+it never overlaps with timing).
+"""
+import argparse
+import bisect
+import gc
+import json
+import platform
+import random
 import subprocess
+import sys
 import time
-import random
-import tempfile
-import os
-
-TREAP_SCRIPT = "treap.py"  # Change if your file has a different name
-
-def generate_basic_test_case(num_ops=100000):
-    ops = ["Basic", str(num_ops)]
-    inserted = set()
-    for _ in range(num_ops):
-        op = random.choices(["Insert", "Delete", "Search", "Inorder"], weights=[4, 3, 2, 1])[0]
-        if op == "Insert":
-            x = random.randint(1, 1000)
-            inserted.add(x)
-            ops.append(f"Insert {x}")
-        elif op == "Delete":
-            if inserted:
-                x = random.choice(list(inserted))
-                inserted.discard(x)
-                ops.append(f"Delete {x}")
-            else:
-                ops.append(f"Delete {random.randint(1, 1000)}")
-        elif op == "Search":
-            x = random.randint(1, 1000)
-            ops.append(f"Search {x}")
-        else:
-            ops.append("Inorder")
-    return "\n".join(ops)
-
-def run_basic_test():
-    input_str = generate_basic_test_case(100000)
-    with tempfile.NamedTemporaryFile("w+", delete=False) as f:
-        f.write(input_str)
-        f.flush()
-        f_path = f.name
+import tracemalloc
+
+from array_treap import ArrayTreap
+from treap import Treap
+
+BACKENDS = {"treap": Treap, "array": ArrayTreap}
+OPS = ("insert", "search", "split", "merge", "inorder", "delete")
+DISTRIBUTIONS = ("sorted", "reverse", "uniform", "zipf", "duplicates")
+DEFAULT_SIZES = (10 ** 3, 10 ** 4, 10 ** 5)
+
+
+# --- Key distributions -------------------------------------------------
 
+def _zipf_keys(n, rnd, s=1.1):
+    # Inverse-CDF sampling over ranks 1..n with weight 1/rank^s
+    cumulative = []
+    total = 0.0
+    for rank in range(1, n + 1):
+        total += rank ** -s
+        cumulative.append(total)
+    # Scatter ranks over the key space so hot keys are not all adjacent
+    scatter = rnd.sample(range(10 * n), n)
+    return [scatter[bisect.bisect_left(cumulative, rnd.random() * total)] for _ in range(n)]
+
+
+def make_keys(dist, n, seed=0):
+    rnd = random.Random(seed)
+    if dist == "sorted":
+        return list(range(n))
+    if dist == "reverse":
+        return list(range(n - 1, -1, -1))
+    if dist == "uniform":
+        return [rnd.randrange(10 * n) for _ in range(n)]
+    if dist == "zipf":
+        return _zipf_keys(n, rnd)
+    if dist == "duplicates":
+        return [rnd.randrange(max(1, n // 100)) for _ in range(n)]
+    raise ValueError(f"unknown distribution: {dist}")
+
+
+# --- Measurement -------------------------------------------------------
+
+def _summary(op, latencies):
+    latencies.sort()
+    count = len(latencies)
+    total = sum(latencies)
+    return {
+        "op": op,
+        "count": count,
+        "ops_per_sec": count / (total / 1e9) if total else float("inf"),
+        "p50_us": latencies[count // 2] / 1e3,
+        "p99_us": latencies[int(0.99 * (count - 1))] / 1e3,
+    }
+
+
+def bench_scenario(treap_cls, keys, ops, seed=0, rounds=1000):
+    rnd = random.Random(seed)
+    clock = time.perf_counter_ns
+    results = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()  # keep collector pauses out of individual latencies
     try:
-        start = time.time()
-        result = subprocess.run(
-            ["python3", TREAP_SCRIPT, f_path],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        end = time.time()
-        print(f"Execution Time: {end - start:.4f} seconds\n")
+        t = treap_cls()
+        lat = []
+        for k in keys:
+            t0 = clock()
+            t.insert(k)
+            lat.append(clock() - t0)
+        if "insert" in ops:
+            results.append(_summary("insert", lat))
+
+        present = sorted(set(keys))
+        if "search" in ops:
+            # Half hits, half (mostly) misses
+            queries = [rnd.choice(present) if i % 2 else rnd.randrange(-len(keys), 11 * len(keys))
+                       for i in range(len(keys))]
+            lat = []
+            search = t.search
+            for q in queries:
+                t0 = clock()
+                search(q)
+                lat.append(clock() - t0)
+            results.append(_summary("search", lat))
+
+        if "split" in ops or "merge" in ops:
+            split_lat, merge_lat = [], []
+            merge = type(t).merge
+            for _ in range(min(rounds, len(present))):
+                k = rnd.choice(present)
+                t0 = clock()
+                left_t, right_t = t.split(k)
+                t1 = clock()
+                t = merge(left_t, right_t)
+                t2 = clock()
+                split_lat.append(t1 - t0)
+                merge_lat.append(t2 - t1)
+            if "split" in ops:
+                results.append(_summary("split", split_lat))
+            if "merge" in ops:
+                results.append(_summary("merge", merge_lat))
+
+        if "inorder" in ops:
+            lat = []
+            for _ in range(5):
+                t0 = clock()
+                t.inorder()
+                lat.append(clock() - t0)
+            res = _summary("inorder", lat)
+            res["keys_per_sec"] = res["ops_per_sec"] * len(present)
+            results.append(res)
+
+        if "delete" in ops:
+            order = present[:]
+            rnd.shuffle(order)
+            lat = []
+            for k in order:
+                t0 = clock()
+                t.delete(k)
+                lat.append(clock() - t0)
+            results.append(_summary("delete", lat))
     finally:
-        os.remove(f_path)
+        if gc_was_enabled:
+            gc.enable()
+    return results
+
+
+def measure_memory(treap_cls, keys):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        t = treap_cls()
+        for k in keys:
+            t.insert(k)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    distinct = len(set(keys))
+    return {"peak_bytes": peak, "bytes_per_key": current / distinct if distinct else 0.0}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(backend, sizes, dists, ops, memory=True, seed=0):
+    treap_cls = BACKENDS[backend]
+    report = {
+        "meta": {
+            "backend": backend,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": [],
+    }
+    for n in sizes:
+        for dist in dists:
+            keys = make_keys(dist, n, seed)
+            for res in bench_scenario(treap_cls, keys, ops, seed):
+                res.update(size=n, dist=dist)
+                report["results"].append(res)
+                print(f"{n:>9} {dist:<10} {res['op']:<8} {res['ops_per_sec']:>12.0f} ops/s"
+                      f"  p50 {res['p50_us']:>9.2f}us  p99 {res['p99_us']:>9.2f}us")
+            if memory:
+                mem = measure_memory(treap_cls, keys)
+                mem.update(size=n, dist=dist, op="memory")
+                report["results"].append(mem)
+                print(f"{n:>9} {dist:<10} memory   peak {mem['peak_bytes'] / 2 ** 20:>9.1f} MiB"
+                      f"  {mem['bytes_per_key']:.1f} B/key")
+    return report
+
+
+# Print throughput ratios against an earlier report; ratios below
+# 1 - threshold are flagged as regressions
+def compare(report, baseline, threshold=0.1):
+    old = {(r["size"], r["dist"], r["op"]): r for r in baseline["results"]}
+    regressions = 0
+    for r in report["results"]:
+        prev = old.get((r["size"], r["dist"], r["op"]))
+        if prev is None or "ops_per_sec" not in r:
+            continue
+        ratio = r["ops_per_sec"] / prev["ops_per_sec"]
+        flag = ""
+        if ratio < 1 - threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{r['size']:>9} {r['dist']:<10} {r['op']:<8} x{ratio:.2f}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="treap")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                        help="tree sizes (up to 10**7; large sizes take minutes and GBs)")
+    parser.add_argument("--dists", nargs="+", choices=DISTRIBUTIONS, default=list(DISTRIBUTIONS))
+    parser.add_argument("--ops", nargs="+", choices=OPS, default=list(OPS))
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--compare", help="earlier JSON report to compare throughput against")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="relative slowdown reported as a regression")
+    args = parser.parse_args(argv)
+
+    report = run_suite(args.backend, args.sizes, args.dists, args.ops,
+                       memory=not args.no_memory, seed=args.seed)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            return 1
+    return 0
+
 
 if __name__ == "__main__":
-    run_basic_test()
+    sys.exit(main())
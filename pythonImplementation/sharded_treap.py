@@ -0,0 +1,252 @@
+import multiprocessing as mp
+import os
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+
+from fastio import OutputBuffer, read_lines
+from treap import DELETE, INORDER, INSERT, SEARCH, Treap, _write_keys, parse_ops
+
+
+# Worker loop: owns one Treap and serves requests from the front end.
+# Batches travel as array('b') opcodes + array('q') keys, which pickle
+# as flat buffers.
+def _worker(conn):
+    t = Treap()
+    load = 0  # operations served since the last rebalance
+    while True:
+        cmd, arg = conn.recv()
+        if cmd == "batch":
+            codes, keys = arg
+            load += len(codes)
+            insert, delete, search = t.insert, t.delete, t.search
+            found = array("b")
+            for code, key in zip(codes, keys):
+                if code == INSERT:
+                    insert(key)
+                elif code == DELETE:
+                    delete(key)
+                else:
+                    found.append(search(key))
+            conn.send(found)
+        elif cmd == "keys":
+            lo, hi = arg
+            conn.send(array("q", t.irange(lo, hi)))
+        elif cmd == "insert_many":
+            t.insert_many(arg)
+            conn.send(None)
+        elif cmd == "take":
+            # Remove and return keys in [lo, hi) (None = unbounded)
+            lo, hi = arg
+            taken = array("q", (k for k in t.irange(lo, hi) if hi is None or k < hi))
+            for key in taken:
+                t.delete(key)
+            conn.send(taken)
+        elif cmd == "size":
+            conn.send(len(t))
+        elif cmd == "stats":
+            conn.send((len(t), load))
+            load = 0
+        elif cmd == "select":
+            conn.send(t.select(arg))
+        elif cmd == "close":
+            conn.send(None)
+            conn.close()
+            return
+
+
+# Front end for N worker processes, each holding the Treap for one
+# contiguous key range: shard i owns boundaries[i-1] <= key < boundaries[i].
+# Insert/Delete/Search are routed in per-shard batches that the workers
+# run concurrently; Inorder and split stitch shard results in key order.
+# Keys must fit in a signed 64-bit integer.
+class ShardedTreap:
+    def __init__(self, boundaries):
+        self.boundaries = list(boundaries)
+        if self.boundaries != sorted(set(self.boundaries)):
+            raise ValueError("shard boundaries must be strictly increasing")
+        self._conns = []
+        self._procs = []
+        for _ in range(len(self.boundaries) + 1):
+            parent, child = mp.Pipe()
+            proc = mp.Process(target=_worker, args=(child,), daemon=True)
+            proc.start()
+            child.close()
+            self._conns.append(parent)
+            self._procs.append(proc)
+
+    # Evenly partition [lo, hi) into n_shards ranges (default: one per core)
+    @classmethod
+    def for_range(cls, lo, hi, n_shards=None):
+        n = n_shards or os.cpu_count() or 1
+        step = max(1, (hi - lo) // n)
+        return cls(lo + i * step for i in range(1, n) if lo + i * step < hi)
+
+    def close(self):
+        for conn in self._conns:
+            conn.send(("close", None))
+            conn.recv()
+        for proc in self._procs:
+            proc.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _shard(self, key):
+        return bisect_right(self.boundaries, key)
+
+    # Send one request to every listed shard first, then collect the
+    # replies, so the workers run concurrently
+    def _broadcast(self, requests):
+        for i, msg in requests:
+            self._conns[i].send(msg)
+        return [(i, self._conns[i].recv()) for i, _ in requests]
+
+    # Run Insert/Delete/Search opcodes (see treap.parse_ops) and return the
+    # Search results in input order. Operations on different shards touch
+    # disjoint keys, so each shard may run its own slice independently.
+    def execute(self, codes, keys):
+        n = len(self._conns)
+        shard_codes = [array("b") for _ in range(n)]
+        shard_keys = [array("q") for _ in range(n)]
+        search_shards = []
+        shard_of = self._shard
+        for code, key in zip(codes, keys):
+            i = shard_of(key)
+            shard_codes[i].append(code)
+            shard_keys[i].append(key)
+            if code == SEARCH:
+                search_shards.append(i)
+        replies = dict(self._broadcast(
+            [(i, ("batch", (shard_codes[i], shard_keys[i]))) for i in range(n) if shard_codes[i]]))
+        cursors = [0] * n
+        results = []
+        for i in search_shards:
+            results.append(bool(replies[i][cursors[i]]))
+            cursors[i] += 1
+        return results
+
+    def insert(self, key):
+        self.execute((INSERT,), (key,))
+
+    def delete(self, key):
+        self.execute((DELETE,), (key,))
+
+    def search(self, key):
+        return self.execute((SEARCH,), (key,))[0]
+
+    def insert_many(self, keys):
+        per_shard = {}
+        for key in keys:
+            per_shard.setdefault(self._shard(key), []).append(key)
+        self._broadcast([(i, ("insert_many", ks)) for i, ks in per_shard.items()])
+
+    # Keys with lo <= key <= hi (None = unbounded) from all shards, in order
+    def irange(self, lo=None, hi=None):
+        first = 0 if lo is None else self._shard(lo)
+        last = len(self._conns) - 1 if hi is None else self._shard(hi)
+        for _, part in self._broadcast([(i, ("keys", (lo, hi))) for i in range(first, last + 1)]):
+            yield from part
+
+    def __iter__(self):
+        return self.irange()
+
+    def inorder(self):
+        return list(self.irange())
+
+    # Local (Treap, Treap) holding keys < key and >= key; the shards are
+    # left unchanged
+    def split(self, key):
+        keys = self.inorder()
+        cut = bisect_left(keys, key)
+        return Treap.from_sorted(keys[:cut]), Treap.from_sorted(keys[cut:])
+
+    # Absorb every key of another treap (any iterable of keys works)
+    def merge(self, other):
+        self.insert_many(other)
+
+    def __len__(self):
+        return sum(size for _, size in self._broadcast(
+            [(i, ("size", None)) for i in range(len(self._conns))]))
+
+    # Move the boundary next to the hottest shard (by operations served
+    # since the last call) when its load exceeds `threshold` times the
+    # mean: half of its keys go to its less loaded neighbour.
+    # Returns True if a boundary moved.
+    def rebalance(self, threshold=2.0):
+        n = len(self._conns)
+        if n < 2:
+            return False
+        stats = [s for _, s in self._broadcast([(i, ("stats", None)) for i in range(n)])]
+        loads = [load for _, load in stats]
+        mean = sum(loads) / n
+        hot = max(range(n), key=loads.__getitem__)
+        size = stats[hot][0]
+        if mean == 0 or loads[hot] <= threshold * mean or size < 2:
+            return False
+
+        if hot == 0:
+            to_left = False
+        elif hot == n - 1:
+            to_left = True
+        else:
+            to_left = loads[hot - 1] <= loads[hot + 1]
+        conn = self._conns[hot]
+        conn.send(("select", size // 2))
+        median = conn.recv()
+        if to_left:
+            # Keys below the median move down; boundary hot-1 rises to it
+            conn.send(("take", (None, median)))
+            moved = conn.recv()
+            self._conns[hot - 1].send(("insert_many", moved))
+            self._conns[hot - 1].recv()
+            self.boundaries[hot - 1] = median
+        else:
+            # Keys from the median up move to the right neighbour
+            conn.send(("take", (median, None)))
+            moved = conn.recv()
+            self._conns[hot + 1].send(("insert_many", moved))
+            self._conns[hot + 1].recv()
+            self.boundaries[hot] = median
+        return True
+
+
+# Basic-mode driver: same input format and output as treap.py, with the
+# key space [lo, hi) sharded over worker processes
+#   python3 sharded_treap.py input.txt [n_shards] [lo hi]
+def main():
+    lines = read_lines(sys.argv[1])
+    n_shards = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    lo, hi = (int(sys.argv[3]), int(sys.argv[4])) if len(sys.argv) > 4 else (0, 1 << 31)
+    if lines[0].strip() != b"Basic":
+        raise SystemExit("sharded driver only supports Basic mode")
+    codes, keys, _ = parse_ops(lines, 2, int(lines[1]))
+
+    out = OutputBuffer()
+    write = out.write
+    with ShardedTreap.for_range(lo, hi, n_shards) as st:
+        start = 0
+        n = len(codes)
+        # Inorder is a barrier: run everything before it, then stitch
+        while start < n:
+            end = start
+            while end < n and codes[end] != INORDER:
+                end += 1
+            seg_codes, seg_keys = codes[start:end], keys[start:end]
+            found = iter(st.execute(seg_codes, seg_keys))
+            for code, key in zip(seg_codes, seg_keys):
+                if code == SEARCH:
+                    write("Search %d: %s\n" % (key, "Found" if next(found) else "Not Found"))
+            if end < n:
+                write("Inorder: ")
+                _write_keys(write, st)
+                st.rebalance()
+            start = end + 1
+    out.flush()
+
+
+if __name__ == "__main__":
+    main()
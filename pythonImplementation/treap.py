@@ -1,12 +1,39 @@
+import gc
 import random
+import sys
+from contextlib import contextmanager
+from itertools import islice
 
-# Node of treap: stores key, heap priority, and children
+from fastio import OutputBuffer, read_lines
+
+# Bulk builds allocate millions of acyclic nodes; letting the cyclic GC
+# rescan the growing heap meanwhile costs several times the build itself
+@contextmanager
+def _gc_paused():
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
+# Node of treap: stores key, heap priority, children and subtree size
 class Node:
+    __slots__ = ("key", "priority", "left", "right", "size")
+
     def __init__(self, key, priority=None):
         self.key = key
         self.priority = priority if priority is not None else random.random()
         self.left = None
         self.right = None
+        self.size = 1
+
+
+# Subtree size of a possibly empty node
+def _size(node):
+    return node.size if node is not None else 0
 
 
 class Treap:
@@ -23,6 +50,7 @@ class Treap:
         x = y.left
         y.left = x.right
         x.right = y
+        x.size, y.size = y.size, y.size - 1 - _size(x.left)
         return x
 
     # Left rotate to fix heap violation
@@ -35,57 +63,77 @@ class Treap:
         y = x.right
         x.right = y.left
         y.left = x
+        y.size, x.size = x.size, x.size - 1 - _size(y.right)
         return y
 
     # Insert a key with optional priority
-    # Standard BST insert, then rotate if heap violated
-    def _insert(self, node, key, priority=None):
-        if node is None:
-            # Reached a null position, create new node
-            return Node(key, priority)
+    # Iterative BST descent records the path, then the new leaf is
+    # rotated up while it beats its parent's priority (no recursion)
+    # `new` may pass an existing detached node to link in instead of
+    # allocating one (used by union)
+    def _insert(self, node, key, priority=None, new=None):
+        # Ancestors are grown on the way down and restored on a duplicate
+        path = []
+        cur = node
+        while cur is not None:
+            if key < cur.key:
+                cur.size += 1
+                path.append(cur)
+                cur = cur.left
+            elif key > cur.key:
+                cur.size += 1
+                path.append(cur)
+                cur = cur.right
+            else:
+                for anc in path:
+                    anc.size -= 1
+                return node  # Key already present, tree unchanged
 
-        if key < node.key:
-            node.left = self._insert(node.left, key, priority)
-            if node.left.priority < node.priority:
+        # Reached a null position, create new node
+        cur = new if new is not None else Node(key, priority)
+        while path:
+            parent = path.pop()
+            if key < parent.key:
+                parent.left = cur
+                if cur.priority >= parent.priority:
+                    return node  # Heap order holds, ancestors untouched
                 # If the left child has a higher priority (smaller number), rotate right
-                node = self._rotate_right(node)
-
-        elif key > node.key:
-            node.right = self._insert(node.right, key, priority)
-            if node.right.priority < node.priority:
+                cur = self._rotate_right(parent)
+            else:
+                parent.right = cur
+                if cur.priority >= parent.priority:
+                    return node
                 # If the right child has a higher priority, rotate left
-                node = self._rotate_left(node)
-
-        return node
+                cur = self._rotate_left(parent)
+        return cur  # New node bubbled all the way up
 
     def insert(self, key, priority=None):
         self.root = self._insert(self.root, key, priority)
 
-    # Delete key by BST search, then rotate to leaf
+    # Delete key by BST search, then replace the node by the merge of
+    # its children (same shape as rotating it down to a leaf)
+    # Ancestors are shrunk on the way down and restored on a miss
     def _delete(self, node, key):
-        if node is None:
-            return None
+        parent = None
+        cur = node
+        while cur is not None and cur.key != key:
+            cur.size -= 1
+            parent = cur
+            cur = cur.left if key < cur.key else cur.right
+        if cur is None:
+            cur = node
+            while cur is not None:  # Key not present, undo the sizes
+                cur.size += 1
+                cur = cur.left if key < cur.key else cur.right
+            return node
 
-        if key < node.key:
-            node.left = self._delete(node.left, key)
-        elif key > node.key:
-            node.right = self._delete(node.right, key)
+        sub = self._merge_nodes(cur.left, cur.right)
+        if parent is None:
+            return sub
+        if parent.left is cur:
+            parent.left = sub
         else:
-            # Node found, now handle 0, 1, or 2 children cases
-            if node.left is None and node.right is None:
-                # Case 1: Leaf node
-                return None
-            elif node.left and node.right:
-                # Case 3: Two children → rotate child with smaller priority
-                if node.left.priority < node.right.priority:
-                    node = self._rotate_right(node)
-                    node.right = self._delete(node.right, key)
-                else:
-                    node = self._rotate_left(node)
-                    node.left = self._delete(node.left, key)
-            else:
-                # Case 2: One child → replace node with child
-                node = node.left or node.right
+            parent.right = sub
         return node
 
     def delete(self, key):
@@ -103,20 +151,74 @@ class Treap:
                 return True  # Key found
         return False
 
+    def __len__(self):
+        return _size(self.root)
+
+    # Number of keys < key (or <= key when inclusive), via subtree sizes
+    def rank(self, key, inclusive=False):
+        cur = self.root
+        r = 0
+        while cur is not None:
+            if key < cur.key or (key == cur.key and not inclusive):
+                cur = cur.left
+            else:
+                r += 1 + _size(cur.left)
+                cur = cur.right
+        return r
+
+    # The k-th smallest key (0-based)
+    def select(self, k):
+        if not 0 <= k < _size(self.root):
+            raise IndexError("treap index out of range")
+        cur = self.root
+        while True:
+            left_size = _size(cur.left)
+            if k < left_size:
+                cur = cur.left
+            elif k == left_size:
+                return cur.key
+            else:
+                k -= left_size + 1
+                cur = cur.right
+
+    # Number of keys with lo <= key <= hi
+    def count_range(self, lo, hi):
+        if hi < lo:
+            return 0
+        return self.rank(hi, inclusive=True) - self.rank(lo)
+
     # Split treap into two treaps based on key
     # Left treap has keys < key, right treap has keys >= key
+    # Top-down: each visited node is hooked onto the spine of L or R,
+    # then sizes are recomputed deepest-first along the visited path
     def _split(self, node, key):
-        if node is None:
-            return (None, None)
-
-        if key <= node.key:
-            L, R = self._split(node.left, key)
-            node.left = R  # Attach leftover right split to node
-            return (L, node)
-        else:
-            L, R = self._split(node.right, key)
-            node.right = L  # Attach leftover left split to node
-            return (node, R)
+        left_root = right_root = None
+        left_tail = right_tail = None  # Last node whose right/left is still open
+        path = []
+        while node is not None:
+            path.append(node)
+            if key <= node.key:
+                if right_tail is None:
+                    right_root = node
+                else:
+                    right_tail.left = node
+                right_tail = node
+                node = node.left
+            else:
+                if left_tail is None:
+                    left_root = node
+                else:
+                    left_tail.right = node
+                left_tail = node
+                node = node.right
+        if left_tail is not None:
+            left_tail.right = None
+        if right_tail is not None:
+            right_tail.left = None
+        for n in reversed(path):
+            l, r = n.left, n.right
+            n.size = 1 + (l.size if l is not None else 0) + (r.size if r is not None else 0)
+        return (left_root, right_root)
 
     def split(self, key):
         L, R = self._split(self.root, key)
@@ -125,18 +227,45 @@ class Treap:
         return (left_t, right_t)
 
     # Merge two treaps: left < right, heap priority decides root
+    # Top-down: walk the right spine of left and left spine of right,
+    # always hooking the higher-priority root onto the open slot. A hooked
+    # node's subtree gains exactly the other side's remaining nodes.
     def _merge_nodes(self, left, right):
         if left is None or right is None:
             return left or right  # One tree is empty
 
-        if left.priority < right.priority:
-            # Left root has higher priority → attach merge to its right
-            left.right = self._merge_nodes(left.right, right)
-            return left
+        root = parent = None
+        hook_right = False  # Which child of parent is the open slot
+        left_size, right_size = left.size, right.size
+        while left is not None and right is not None:
+            if left.priority < right.priority:
+                # Left root has higher priority → merge continues on its right
+                nxt = left
+                left.size = left_size + right_size
+                left = left.right
+                left_size = _size(left)
+                next_hook_right = True
+            else:
+                # Right root has higher priority → merge continues on its left
+                nxt = right
+                right.size = left_size + right_size
+                right = right.left
+                right_size = _size(right)
+                next_hook_right = False
+            if parent is None:
+                root = nxt
+            elif hook_right:
+                parent.right = nxt
+            else:
+                parent.left = nxt
+            parent, hook_right = nxt, next_hook_right
+
+        rest = left if left is not None else right
+        if hook_right:
+            parent.right = rest
         else:
-            # Right root has higher priority → attach merge to its left
-            right.left = self._merge_nodes(left, right.left)
-            return right
+            parent.left = rest
+        return root
 
     @staticmethod
     def merge(left_treap: "Treap", right_treap: "Treap") -> "Treap":
@@ -144,75 +273,386 @@ class Treap:
         t.root = t._merge_nodes(left_treap.root, right_treap.root)
         return t
 
-    # In-order traversal for sorted keys
+    # Detach the minimum of a subtree if its key equals `key`
+    # Returns (new subtree, detached node or None)
+    def _pop_min_if(self, node, key):
+        spine = []
+        cur = node
+        while cur is not None and cur.left is not None:
+            spine.append(cur)
+            cur = cur.left
+        if cur is None or cur.key != key:
+            return (node, None)
+        if not spine:
+            return (cur.right, cur)
+        spine[-1].left = cur.right
+        for anc in spine:
+            anc.size -= 1
+        return (node, cur)
+
+    # Node that set algebra may relink: the node itself here (inputs are
+    # consumed); PersistentTreap hands out a copy instead
+    def _own(self, node):
+        return node
+
+    # Shared engine for union / intersection / difference of two subtrees.
+    # Root r of one side splits the other side at r.key; both halves are
+    # combined recursively (explicit post-order stack), then r is kept on
+    # top or dropped and its halves merged. Expected O(m log(n/m)).
+    _UNION, _INTERSECTION, _DIFFERENCE = range(3)
+
+    def _set_op(self, a, b, op):
+        results = []
+        work = [(False, a, b)]
+        while work:
+            combine, x, y = work.pop()
+            if combine:
+                right = results.pop()
+                left = results.pop()
+                if y:  # Keep root x on top of the combined halves
+                    x = self._own(x)
+                    x.left, x.right = left, right
+                    x.size = 1 + _size(left) + _size(right)
+                    results.append(x)
+                else:
+                    results.append(self._merge_nodes(left, right))
+                continue
+
+            if op == self._UNION and x is not None and y is not None:
+                # Single leftover node: plain insert is far cheaper than a split
+                if y.left is None and y.right is None:
+                    results.append(self._insert(x, y.key, new=self._own(y)))
+                    continue
+                if x.left is None and x.right is None:
+                    results.append(self._insert(y, x.key, new=self._own(x)))
+                    continue
+            if x is None or y is None:
+                if op == self._UNION:
+                    results.append(x or y)
+                elif op == self._INTERSECTION:
+                    results.append(None)
+                else:
+                    results.append(x)
+                continue
+
+            # Union and intersection are symmetric: root the higher priority
+            if op != self._DIFFERENCE and y.priority < x.priority:
+                x, y = y, x
+            L, R = self._split(y, x.key)
+            R, dup = self._pop_min_if(R, x.key)
+            if op == self._UNION:
+                keep = True
+            elif op == self._INTERSECTION:
+                keep = dup is not None
+            else:
+                keep = dup is None
+            work.append((True, x, keep))
+            work.append((False, x.right, R))
+            work.append((False, x.left, L))
+        return results[0]
+
+    # Set algebra between treaps. Nodes of both inputs are reused (the
+    # inputs must not be used afterwards), like merge.
+    @staticmethod
+    def union(left_treap: "Treap", right_treap: "Treap") -> "Treap":
+        t = Treap()
+        t.root = t._set_op(left_treap.root, right_treap.root, Treap._UNION)
+        return t
+
+    @staticmethod
+    def intersection(left_treap: "Treap", right_treap: "Treap") -> "Treap":
+        t = Treap()
+        t.root = t._set_op(left_treap.root, right_treap.root, Treap._INTERSECTION)
+        return t
+
+    # Keys of left_treap that are not in right_treap
+    @staticmethod
+    def difference(left_treap: "Treap", right_treap: "Treap") -> "Treap":
+        t = Treap()
+        t.root = t._set_op(left_treap.root, right_treap.root, Treap._DIFFERENCE)
+        return t
+
+    # Link key-sorted nodes into a treap in O(n) (Cartesian tree build):
+    # the stack holds the current right spine, popped nodes become the
+    # left subtree of the first node that beats their priority. A node's
+    # subtree is final once popped, so its size is set then.
+    @staticmethod
+    def _build_sorted_nodes(nodes):
+        stack = []
+        for node in nodes:
+            last = None
+            while stack and stack[-1].priority > node.priority:
+                last = stack.pop()
+                last.size = 1 + _size(last.left) + _size(last.right)
+            node.left = last
+            node.right = None
+            if stack:
+                stack[-1].right = node
+            stack.append(node)
+        root = stack[0] if stack else None
+        while stack:
+            last = stack.pop()
+            last.size = 1 + _size(last.left) + _size(last.right)
+        return root
+
+    # Build a treap from ascending keys in O(n); repeated keys are skipped
+    @classmethod
+    def from_sorted(cls, keys):
+        def _nodes():
+            prev = None
+            first = True
+            for key in keys:
+                if not first and key <= prev:
+                    if key == prev:
+                        continue
+                    raise ValueError("from_sorted requires keys in ascending order")
+                yield Node(key)
+                prev, first = key, False
+        t = cls()
+        with _gc_paused():
+            t.root = t._build_sorted_nodes(_nodes())
+        return t
+
+    # Yield the nodes of a subtree in key order (explicit stack)
+    @staticmethod
+    def _iter_nodes(node):
+        stack = []
+        cur = node
+        while cur is not None or stack:
+            while cur is not None:
+                stack.append(cur)
+                cur = cur.left
+            cur = stack.pop()
+            yield cur
+            cur = cur.right
+
+    # Insert a batch of keys: sort it, merge it with the existing nodes in
+    # key order and relink everything in one pass, O(n + m log m).
+    # Existing nodes (and their priorities) are reused as-is.
+    def insert_many(self, keys):
+        batch = sorted(set(keys))
+        if not batch:
+            return
+        with _gc_paused():
+            merged = []
+            i, m = 0, len(batch)
+            for node in self._iter_nodes(self.root):
+                while i < m and batch[i] < node.key:
+                    merged.append(Node(batch[i]))
+                    i += 1
+                if i < m and batch[i] == node.key:
+                    i += 1  # Key already present
+                merged.append(node)
+            merged.extend(Node(key) for key in batch[i:])
+            self.root = self._build_sorted_nodes(merged)
+
+    # In-order traversal for sorted keys (explicit stack, no recursion)
     def inorder(self, node=None):
         if node is None:
             node = self.root
         res = []
-        def _rec(n):
-            if not n:
-                return
-            _rec(n.left)         # Traverse left subtree
-            res.append(n.key)    # Visit node
-            _rec(n.right)        # Traverse right subtree
-        _rec(node)
+        stack = []
+        cur = node
+        while cur is not None or stack:
+            while cur is not None:
+                stack.append(cur)  # Traverse left subtree
+                cur = cur.left
+            cur = stack.pop()
+            res.append(cur.key)    # Visit node
+            cur = cur.right        # Traverse right subtree
         return res
 
+    def __iter__(self):
+        return self.irange()
 
-# Parse and execute commands on a treap
-def run_treap_ops(lines):
-    t = Treap()
-    for line in lines:
-        parts = line.strip().split()
+    # Lazily yield keys with lo <= key <= hi (None = unbounded), ascending
+    # or descending. Memory is O(depth) and the walk stops past the bound.
+    def irange(self, lo=None, hi=None, reverse=False):
+        stack = []
+        cur = self.root
+        if not reverse:
+            # Left spine of the part with keys >= lo
+            while cur is not None:
+                if lo is not None and cur.key < lo:
+                    cur = cur.right
+                else:
+                    stack.append(cur)
+                    cur = cur.left
+            while stack:
+                node = stack.pop()
+                if hi is not None and node.key > hi:
+                    return
+                yield node.key
+                cur = node.right
+                while cur is not None:
+                    stack.append(cur)
+                    cur = cur.left
+        else:
+            # Right spine of the part with keys <= hi
+            while cur is not None:
+                if hi is not None and cur.key > hi:
+                    cur = cur.left
+                else:
+                    stack.append(cur)
+                    cur = cur.right
+            while stack:
+                node = stack.pop()
+                if lo is not None and node.key < lo:
+                    return
+                yield node.key
+                cur = node.left
+                while cur is not None:
+                    stack.append(cur)
+                    cur = cur.right
+
+    # Keys at in-order positions [start, stop), lazily; the start
+    # position is reached in O(log n) through select
+    def islice(self, start=0, stop=None, reverse=False):
+        n = _size(self.root)
+        if start >= n:
+            return iter(())
+        count = None if stop is None else max(stop - start, 0)
+        if reverse:
+            keys = self.irange(hi=self.select(n - 1 - start), reverse=True)
+        else:
+            keys = self.irange(lo=self.select(start))
+        return islice(keys, count)
+
+
+# Stream keys formatted like a Python list ("[1, 2, 3]") in fixed-size
+# chunks, so printing a large treap never builds the whole key list
+def _write_keys(write, keys, chunk=4096):
+    write("[")
+    it = iter(keys)
+    block = list(islice(it, chunk))
+    if block:
+        write(", ".join(map(str, block)))
+        while True:
+            block = list(islice(it, chunk))
+            if not block:
+                break
+            write(", ")
+            write(", ".join(map(str, block)))
+    write("]\n")
+
+# Command opcodes; names are accepted as bytes (tokenized input) or as
+# str (lines handed to run_treap_ops)
+INSERT, DELETE, SEARCH, INORDER = range(4)
+_OPCODES = {}
+for _name, _code in (("Insert", INSERT), ("Delete", DELETE),
+                     ("Search", SEARCH), ("Inorder", INORDER)):
+    _OPCODES[_name] = _OPCODES[_name.encode()] = _code
+_TAKES_KEY = (True, True, True, False)
+
+
+# Compile `count` command lines (all when None) starting at lines[pos]
+# into parallel opcode / key lists; returns (codes, keys, next position).
+# Blank lines and unknown commands still use up their line of the count.
+def parse_ops(lines, pos=0, count=None):
+    codes, keys = [], []
+    end = len(lines) if count is None else min(len(lines), pos + count)
+    for line in lines[pos:end]:
+        parts = line.split()
         if not parts:
             continue
-        cmd = parts[0]
-        if cmd == "Insert":
-            t.insert(int(parts[1]))
-        elif cmd == "Delete":
-            t.delete(int(parts[1]))
-        elif cmd == "Search":
-            found = t.search(int(parts[1]))
-            print(f"Search {parts[1]}: {'Found' if found else 'Not Found'}")
-        elif cmd == "Inorder":
-            print("Inorder:", t.inorder())
+        code = _OPCODES.get(parts[0], -1)
+        if code < 0:
+            continue
+        keys.append(int(parts[1]) if _TAKES_KEY[code] else 0)
+        codes.append(code)
+    return codes, keys, end
+
+
+# Execute compiled commands on a fresh treap, dispatching through a
+# table indexed by opcode
+def _run_ops(codes, keys, treap_cls, write):
+    t = treap_cls()
+    # The leading run of Inserts is a bulk load into an empty treap:
+    # build the tree in one pass instead of key by key
+    n = len(codes)
+    start = 0
+    while start < n and codes[start] == INSERT:
+        start += 1
+    t.insert_many(keys[:start])
+
+    search = t.search
+
+    def do_search(key):
+        if search(key):
+            write("Search %d: Found\n" % key)
+        else:
+            write("Search %d: Not Found\n" % key)
+
+    def do_inorder(_):
+        write("Inorder: ")
+        _write_keys(write, t)
+
+    handlers = (t.insert, t.delete, do_search, do_inorder)
+    for i in range(start, n):
+        handlers[codes[i]](keys[i])
     return t
 
+
+# Parse and execute command lines on a treap
+# treap_cls selects the backend (Treap, or array_treap.ArrayTreap);
+# output goes to `out` (default sys.stdout)
+def run_treap_ops(lines, treap_cls=Treap, out=None):
+    write = (out if out is not None else sys.stdout).write
+    codes, keys, _ = parse_ops(lines)
+    return _run_ops(codes, keys, treap_cls, write)
+
 # Main function: read mode and input, execute treap ops
+# The whole file is read once and output leaves in large writes
+# `--stats` after the file name runs on InstrumentedTreap and dumps its
+# counters as JSON to stderr
 def main():
-    import sys
-    file_path = sys.argv[1]
-    with open(file_path, "r") as f:
-        lines = f.readlines()
+    lines = read_lines(sys.argv[1])
+    out = OutputBuffer()
+    write = out.write
+
+    treap_cls = Treap
+    stats = None
+    if "--stats" in sys.argv[2:]:
+        from instrumented_treap import InstrumentedTreap, TreapStats
+        stats = TreapStats()
+        treap_cls = lambda: InstrumentedTreap(stats)
+    t = None
 
     mode = lines[0].strip()
-    args = lines[1].strip()
+    args = lines[1].split()
 
-    if mode == "Merge":
+    if mode == b"Merge":
         # Merge two separate treaps
-        n1, n2 = map(int, args.split())
-        ops1 = lines[2:2+n1]
-        ops2 = lines[2+n1:2+n1+n2]
-        t1 = run_treap_ops(ops1)
-        t2 = run_treap_ops(ops2)
-        merged = Treap.merge(t1, t2)
-        print("Merged inorder:", merged.inorder())
-
-    elif mode == "Split":
+        n1, n2 = int(args[0]), int(args[1])
+        codes1, keys1, pos = parse_ops(lines, 2, n1)
+        codes2, keys2, pos = parse_ops(lines, pos, n2)
+        t1 = _run_ops(codes1, keys1, treap_cls, write)
+        t2 = _run_ops(codes2, keys2, treap_cls, write)
+        t = merged = type(t1).merge(t1, t2)
+        write("Merged inorder: ")
+        _write_keys(write, merged)
+
+    elif mode == b"Split":
         # Split a single treap
-        n = int(args)
-        ops = lines[2:2+n]
-        split_key = int(lines[2+n])
-        t = run_treap_ops(ops)
+        n = int(args[0])
+        codes, keys, pos = parse_ops(lines, 2, n)
+        split_key = int(lines[pos])
+        t = _run_ops(codes, keys, treap_cls, write)
         L, R = t.split(split_key)
-        print("Left treap inorder:", L.inorder())
-        print("Right treap inorder:", R.inorder())
+        write("Left treap inorder: ")
+        _write_keys(write, L)
+        write("Right treap inorder: ")
+        _write_keys(write, R)
 
-    elif mode == "Basic":
+    elif mode == b"Basic":
         # Just basic operations
-        n = int(args)
-        ops = lines[2:2+n]
-        t = run_treap_ops(ops)
+        n = int(args[0])
+        codes, keys, _ = parse_ops(lines, 2, n)
+        t = _run_ops(codes, keys, treap_cls, write)
+
+    out.flush()
+    if stats is not None:
+        stats.dump(sys.stderr, t)
 
 if __name__ == "__main__":
     main()
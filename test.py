@@ -27,7 +27,15 @@ class BruteForce:
         res.sort(key=lambda x: x[0])
         return res
 
-def generate_test(N=10000, Q=10000):
+    def count(self, thr, sd, ed):
+        return len(self.query(thr, sd, ed))
+
+    def topk(self, k, sd, ed):
+        res = [(d, p) for d,p in self.events.items() if sd <= d <= ed]
+        res.sort(key=lambda x: (-x[1], x[0]))
+        return res[:k]
+
+def generate_test(N=10000, Q=10000, weights=(0.3,0.2,0.2,0.2,0.05,0.05)):
     valid_dates = []
     for year in range(0, 2025):
         for month in range(1, 13):
@@ -57,7 +65,7 @@ def generate_test(N=10000, Q=10000):
     idx = 0
     # operations
     for _ in range(Q):
-        op = random.choices(['ADD','REMOVE','UPDATE','QUERY'], [0.3,0.2,0.2,0.3])[0]
+        op = random.choices(['ADD','REMOVE','UPDATE','QUERY','COUNT','TOPK'], weights)[0]
         if op == 'ADD' and len(current) < N+Q:
             d = dates[N + idx]; idx+=1
             if d not in current:
@@ -78,7 +86,36 @@ def generate_test(N=10000, Q=10000):
                 sd, ed = ed, sd
             thr = random.getrandbits(32)
             lines.append(f"QUERY {thr} {sd} {ed}")
+        elif op == 'COUNT' and current:
+            sd, ed = random.sample(list(current), 2)
+            if sd > ed:
+                sd, ed = ed, sd
+            thr = random.getrandbits(32)
+            lines.append(f"COUNT {thr} {sd} {ed}")
+        elif op == 'TOPK' and current:
+            sd, ed = random.sample(list(current), 2)
+            if sd > ed:
+                sd, ed = ed, sd
+            k = random.randint(0, 50)
+            lines.append(f"TOPK {k} {sd} {ed}")
+
+    return "\n".join(lines) + "\n"
 
+def generate_edge_test(N=40, Q=400):
+    # events and bounds at and beyond the int64 extremes, in one long
+    # read-only window so pc.py answers it with StaticView
+    lo, hi = -(1 << 63), (1 << 63) - 1
+    dates = random.sample(range(-1000, 1000), N - 4) + [lo, lo + 1, hi - 1, hi]
+    prios = [lo, lo, hi, hi] + [random.choice([lo, lo + 1, -1, 0, 1, hi - 1, hi]) for _ in range(N - 4)]
+    lines = [f"{N} {Q}"] + [f"{d} {p}" for d, p in zip(dates, prios)]
+    edges = [lo - (1 << 63), lo - 1, lo, lo + 1, -1, 0, 1, hi - 1, hi, hi + 1, hi + (1 << 63)]
+    for _ in range(Q):
+        op = random.choice(['QUERY', 'QUERY', 'COUNT', 'TOPK'])
+        a = random.choice(edges + [random.randint(-1000, 1000)])
+        sd, ed = sorted(random.choice(edges) for _ in range(2))
+        if op == 'TOPK':
+            a = random.randint(0, 5)
+        lines.append(f"{op} {a} {sd} {ed}")
     return "\n".join(lines) + "\n"
 
 # --- Brute‐Force Runner (line‐based) ---
@@ -109,6 +146,15 @@ def run_brute(input_str):
         elif op == 'UPDATE':
             d, p = map(int, parts[1:3])
             bf.update(d, p)
+        elif op == 'COUNT':
+            thr, sd, ed = map(int, parts[1:4])
+            out.append(str(bf.count(thr, sd, ed)))
+        elif op == 'TOPK':
+            k, sd, ed = map(int, parts[1:4])
+            res = bf.topk(k, sd, ed)
+            out.append(str(len(res)))
+            for d,p in res:
+                out.append(f"{d} {p}")
         else:  # QUERY
             thr, sd, ed = map(int, parts[1:4])
             res = bf.query(thr, sd, ed)
@@ -121,8 +167,12 @@ def run_brute(input_str):
 # --- Main Test Driver ---
 def main():
     random.seed(0)
-    test_input = generate_test()
+    run_case("mixed", generate_test())
+    # long read-only runs, answered by pc.py's offline StaticView engine
+    run_case("read-heavy", generate_test(N=1000, Q=5000, weights=(0.002,0.002,0.002,0.6,0.2,0.194)))
+    run_case("int64-edges", generate_edge_test())
 
+def run_case(name, test_input):
     # Run treap via subprocess with timeout
     try:
         t0 = time.time()
@@ -136,7 +186,7 @@ def main():
         t1 = time.time()
         treap_out = proc.stdout.strip()
     except subprocess.TimeoutExpired:
-        print("Treap implementation timed out", file=sys.stderr)
+        print(f"[{name}] Treap implementation timed out", file=sys.stderr)
         sys.exit(1)
 
     # Run brute
@@ -145,9 +195,9 @@ def main():
     t3 = time.time()
 
     # Report
-    print(f"Treap time: {t1-t0:.3f}s")
-    print(f"Brute time: {t3-t2:.3f}s")
-    print("Outputs match:", treap_out == brute_out)
+    print(f"[{name}] Treap time: {t1-t0:.3f}s")
+    print(f"[{name}] Brute time: {t3-t2:.3f}s")
+    print(f"[{name}] Outputs match:", treap_out == brute_out)
 
 if __name__ == '__main__':
     main()